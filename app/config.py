@@ -1,3 +1,6 @@
+import os
+import tempfile
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -9,6 +12,71 @@ class Settings(BaseSettings):
     model_type: str = "RandomForestClassifier"
     n_estimators: int = 100
     max_depth: int = 8
+    max_batch_size: int = 10000
+    # Artifact activated at startup; empty means model/model.srf, or model.pkl if the .srf is stale
+    model_path: Optional[str] = None
+    # Token required by the /models admin endpoints and DELETE /cache; unset disables them
+    model_admin_token: Optional[str] = None
+    # How long retiring a version waits for its in-flight requests
+    model_drain_timeout_seconds: float = 30.0
+    # Decode /predict bodies straight from JSON, skipping Pydantic on valid input
+    fast_path_enabled: bool = False
+    # Answer predictions from a precomputed table of the forest's decision regions
+    region_index_enabled: bool = False
+    # Largest grid built at load time; bigger models fall back to tree traversal
+    region_index_max_cells: int = 5_000_000
+    # Stop evaluating trees once a row's majority is settled (same labels); below
+    # adaptive_voting_min_rows the extra passes cost more than the trees they skip
+    adaptive_voting_enabled: bool = False
+    adaptive_voting_min_rows: int = 256
+    # Rows decoded and scored per step by /predict/bulk; bounds its memory use
+    bulk_chunk_rows: int = 10000
+    # Largest batch /predict/stream scores in one pass; rows queue up to 4x this per connection
+    stream_max_batch: int = 256
+    # Admission control for the prediction routes: concurrent requests (0 = unlimited)
+    # and how many more may wait for a slot before getting 503 + Retry-After
+    admission_max_in_flight: int = 0
+    admission_max_queue: int = 100
+    admission_retry_after_seconds: int = 1
+    # Open /predict/stream connections (WebSocket or NDJSON body) per worker (0 = unlimited).
+    # Streams are long-lived, so they get this limit instead of an admission slot each;
+    # beyond it a WebSocket is closed with 1013 and an NDJSON body gets 503 right away
+    stream_max_connections: int = 0
+    # Deadline for requests without X-Request-Deadline-Ms (0 = none); expired ones get 504
+    request_deadline_ms: float = 0.0
+    # Per-client token bucket (requests per second, 0 disables; 429 when empty)
+    rate_limit_per_second: float = 0.0
+    rate_limit_burst: int = 20
+    # Production launcher (python -m app.server): forked workers (0 = usable CPUs), how long
+    # a worker may take to drain or to become ready, and the memory report interval (0 = off)
+    server_workers: int = 0
+    server_graceful_timeout_seconds: float = 30.0
+    server_memory_report_seconds: float = 300.0
+    # Pool where model inference runs: "thread", "process" or "inline" (event loop)
+    inference_executor: Literal["thread", "process", "inline"] = "thread"
+    # Pool size; 0 uses the usable CPUs (affinity and cgroup quota), split between server workers
+    inference_workers: int = 0
+    # Coalesce concurrent /predict calls into one forest pass
+    batching_enabled: bool = False
+    batch_window_ms: float = 2.0
+    batch_max_size: int = 64
+    # Prediction cache; capacity 0 disables it, ttl 0 means entries never expire
+    cache_capacity: int = 1000
+    cache_policy: Literal["lru", "lfu"] = "lru"
+    cache_ttl_seconds: float = 0.0
+    # Round features to this many decimals before keying (None keeps exact values)
+    cache_precision: Optional[int] = None
+    # "memory" is per worker; "sqlite" shares one file between all workers on the node
+    cache_backend: Literal["memory", "sqlite"] = "memory"
+    cache_path: str = os.path.join(tempfile.gettempdir(), "ensamble_cache.sqlite")
+    # Startup warm-up: rows from this CSV (relative to the project root) pre-populate the cache
+    warmup_enabled: bool = True
+    warmup_data_path: str = "notebooks/iris_train.csv"
+    warmup_max_rows: int = 1000
+    # Logging: level, JSON lines vs plain text, and share of per-request DEBUG logs kept
+    log_level: str = "INFO"
+    log_json: bool = True
+    log_request_sample_rate: float = 0.01
 
     class Config:
         env_file = ".env"
@@ -1,10 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
-from app.routers import health, info,predict
+from fastapi.responses import JSONResponse
+from app.routers import health, info,predict, cache, ready, metrics, models
+from app.config import settings
+from app.services.admission import AdmissionMiddleware
+from app.services.batcher import batcher
+from app.services.executor import DeadlineExceeded, shutdown_executor
+from app.services.log import RequestIdMiddleware, setup_logging, shutdown_logging
+from app.services.metrics import ADMISSION_REJECTED, MetricsMiddleware
+from app.services.warmup import readiness, warm_up
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Application startup and shutdown hooks"""
+    setup_logging()
+    if settings.batching_enabled:
+        await batcher.start()
+    # Warm up in the background so /health and /ready answer while it runs
+    warmup_task = None
+    if settings.warmup_enabled:
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        readiness.ready = True
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await batcher.stop()
+    shutdown_executor()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="Ensamble API",
     description="API for ensemble model predictions using RandomForest classifier",
     version="1.0.0",
+    lifespan=lifespan,
     openapi_tags=[
         {
             "name": "Health",
@@ -13,14 +45,38 @@ app = FastAPI(
         {
             "name": "Info",
             "description": "Model configuration and metadata endpoints"
+        },
+        {
+            "name": "Cache",
+            "description": "Prediction cache statistics and invalidation"
+        },
+        {
+            "name": "Models",
+            "description": "Model registry: load, activate and retire versions without restarts"
         }
     ]
 )
 
+# Innermost, so rejected requests are still timed and tagged with a request ID
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(health.router)
+app.include_router(ready.router)
+app.include_router(metrics.router)
 app.include_router(info.router)
 app.include_router(predict.router)
+app.include_router(cache.router)
+app.include_router(models.router)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(_: Request, __: DeadlineExceeded) -> JSONResponse:
+    """The request's deadline passed before its inference started; it was not run"""
+    ADMISSION_REJECTED.inc("expired")
+    return JSONResponse({"detail": "Plazo de la petición vencido"}, status_code=504)
 
 
 @app.api_route(
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Literal, List
+from typing import Any, Dict, Literal, List, Optional, Union
+from app.config import settings
 
 
 class HealthResponse(BaseModel):
@@ -10,6 +11,22 @@ class HealthResponse(BaseModel):
     )
 
 
+class ReadinessResponse(BaseModel):
+    """Readiness check response model"""
+    status: Literal["ready", "warming", "failed"] = Field(
+        description="Warm-up state of this worker",
+        examples=["ready"]
+    )
+    warmup_seconds: Optional[float] = Field(
+        description="Time spent warming up, once finished",
+        examples=[0.12]
+    )
+    cached_rows: int = Field(
+        description="Rows pre-populated into the prediction cache",
+        examples=[120]
+    )
+
+
 class ModelInfo(BaseModel):
     """Model information and configuration"""
     team: str = Field(
@@ -25,15 +42,76 @@ class ModelInfo(BaseModel):
         gt=0,
         examples=[100]
     )
-    max_depth: int = Field(
-        description="Maximum depth of the trees",
-        gt=0,
+    max_depth: Optional[int] = Field(
+        description="Maximum depth of the trees; null means unlimited",
         examples=[8]
     )
-    max_features: str = Field(
+    max_features: Union[str, int, float, None] = Field(
         description="Number of features to consider when looking for the best split",
         examples=["sqrt"]
     )
+    version: str = Field(
+        description="Model version (short artifact hash) answering requests",
+        examples=["997fbde1526d"]
+    )
+    artifact: str = Field(
+        description="Artifact file the model was loaded from",
+        examples=["model.srf"]
+    )
+    sha256: str = Field(
+        description="SHA-256 of the artifact file",
+        examples=["997fbde1526d4ebb3894ec912a162f578b49583a7cfa7542393feda6477c5147"]
+    )
+    classes: List[int] = Field(
+        description="Class labels, in probability column order",
+        examples=[[0, 1, 2]]
+    )
+    n_trees: int = Field(
+        description="Trees actually present in the loaded forest",
+        examples=[50]
+    )
+    node_count: int = Field(
+        description="Total nodes across all trees",
+        examples=[1096]
+    )
+    depth: int = Field(
+        description="Deepest tree in the loaded forest",
+        examples=[10]
+    )
+    memory_bytes: int = Field(
+        description="Bytes held by the model arrays",
+        examples=[54304]
+    )
+    region_index_cells: Optional[int] = Field(
+        None,
+        description="Cells in the precomputed decision-region table, if one is used",
+        examples=[None]
+    )
+    memory_mapped: bool = Field(
+        description="Whether the arrays are memory-mapped and shared between workers",
+        examples=[True]
+    )
+    load_seconds: float = Field(
+        description="Time spent loading the artifact",
+        examples=[0.0007]
+    )
+    oob_score: Optional[float] = Field(
+        description="Out-of-bag accuracy from training",
+        examples=[0.905]
+    )
+    metrics: Dict[str, Any] = Field(
+        description="Evaluation metrics stored with the model",
+        examples=[{"accuracy": 0.917, "f1": 0.917}]
+    )
+
+
+def _check_features(v):
+    """Validation rules shared by every endpoint that receives feature rows"""
+    if len(v) != 4:
+        raise ValueError('Must provide exactly 4 features')
+    if any(x < 0 for x in v):
+        raise ValueError('All features must be greater than or equal to zero')
+    return v
 
 
 class PredictionInput(BaseModel):
@@ -41,14 +119,104 @@ class PredictionInput(BaseModel):
 
     @field_validator('features')
     def validate_features(cls, v):
-        if len(v) != 4:
-            raise ValueError('Must provide exactly 4 features')
-        if any(x < 0 for x in v):
-            raise ValueError('All features must be greater than or equal to zero')
-        return v
+        return _check_features(v)
 class PredictionResponse(BaseModel):
     prediction: Literal["setosa", "versicolor", "virginica", "unknown"]
 
+
+class BatchPredictionInput(BaseModel):
+    instances: List[List[float]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.max_batch_size,
+        description="Rows of 4 feature values each"
+    )
+
+    @field_validator('instances')
+    def validate_instances(cls, v):
+        for i, row in enumerate(v):
+            try:
+                _check_features(row)
+            except ValueError as e:
+                raise ValueError(f'Row {i}: {e}')
+        return v
+
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[Literal["setosa", "versicolor", "virginica", "unknown"]]
+
+
+class ClassScore(BaseModel):
+    """One class with its averaged probability"""
+    label: Literal["setosa", "versicolor", "virginica", "unknown"] = Field(
+        description="Species",
+        examples=["setosa"]
+    )
+    probability: float = Field(
+        description="Mean of the per-tree leaf distributions",
+        ge=0,
+        le=1,
+        examples=[0.97]
+    )
+
+
+class ProbaPredictionResponse(BaseModel):
+    """Label plus class probabilities from the same forest pass"""
+    prediction: Literal["setosa", "versicolor", "virginica", "unknown"] = Field(
+        description="Majority-vote label, same as /predict",
+        examples=["setosa"]
+    )
+    probabilities: Dict[str, float] = Field(
+        description="Probability per species",
+        examples=[{"setosa": 0.97, "versicolor": 0.03, "virginica": 0.0}]
+    )
+    top_k: List[ClassScore] = Field(
+        description="The k most probable species, highest first",
+        examples=[[{"label": "setosa", "probability": 0.97}]]
+    )
+
+class CacheStats(BaseModel):
+    """Prediction cache configuration and counters"""
+    backend: str = Field(description="Storage backend", examples=["memory"])
+    policy: Literal["lru", "lfu"] = Field(description="Eviction policy", examples=["lru"])
+    capacity: int = Field(description="Maximum number of entries", examples=[1000])
+    size: int = Field(description="Current number of entries", examples=[42])
+    ttl_seconds: float = Field(description="Entry lifetime in seconds, 0 means no expiry", examples=[0.0])
+    precision: Optional[int] = Field(description="Decimals used to quantize keys", examples=[2])
+    model_version: Optional[str] = Field(description="Model version of the latest lookup", examples=["3f2a9c1b7e4d"])
+    hits: int = Field(description="Lookups served from the cache", examples=[120])
+    misses: int = Field(description="Lookups that ran the model", examples=[30])
+    evictions: int = Field(description="Entries removed to respect the capacity", examples=[0])
+    expirations: int = Field(description="Entries dropped after their TTL", examples=[0])
+    invalidations: int = Field(description="Times the whole cache was cleared", examples=[0])
+    errors: int = Field(description="Storage errors answered as misses (sqlite backend)", examples=[0])
+    hit_ratio: float = Field(description="hits / (hits + misses)", examples=[0.8])
+
+
+class ModelLoadRequest(BaseModel):
+    """Artifact to register in the model registry"""
+    path: str = Field(
+        description="Path to a .srf artifact or a legacy .pkl, absolute or relative to the project",
+        examples=["model/model.srf"]
+    )
+    activate: bool = Field(
+        default=False,
+        description="Make it the active version once it is warm",
+        examples=[True]
+    )
+
+
+class ModelVersionInfo(BaseModel):
+    """A model version registered in this worker"""
+    version: str = Field(description="Content hash of the artifact", examples=["3f2a9c1b7e4d"])
+    path: str = Field(description="Artifact path", examples=["/app/model/model.srf"])
+    active: bool = Field(description="Whether requests without X-Model-Version use it", examples=[True])
+    in_flight: int = Field(description="Requests currently pinned to this version", examples=[0])
+    loaded_at: float = Field(description="Registration time (Unix seconds)", examples=[1760000000.0])
+    warmup_seconds: Optional[float] = Field(description="Time spent loading and warming it", examples=[0.12])
+    cached_rows: int = Field(description="Rows pre-populated into its prediction cache", examples=[120])
+
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     error: str = Field(
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends
+from app.models.schemas import CacheStats
+from app.routers.models import require_admin
+from app.services.cache import prediction_cache
+
+router = APIRouter(prefix="/cache", tags=["Cache"])
+
+
+@router.get(
+    "/stats",
+    response_model=CacheStats,
+    summary="Prediction Cache Statistics",
+    description="Report the prediction cache configuration and its hit/miss/eviction counters"
+)
+async def cache_stats() -> CacheStats:
+    """
+    Get prediction cache statistics.
+
+    Counters are per process. With the sqlite backend the entries (and size) are
+    shared by every worker on the node; with the memory backend each worker has its own.
+    """
+    return CacheStats(**await prediction_cache.astats())
+
+
+@router.delete(
+    "",
+    response_model=CacheStats,
+    dependencies=[Depends(require_admin)],
+    summary="Clear Prediction Cache",
+    description="Drop every cached prediction and return the resulting statistics",
+    responses={
+        401: {"description": "Invalid admin token"},
+        403: {"description": "Admin endpoints disabled"}
+    }
+)
+async def clear_cache() -> CacheStats:
+    """
+    Invalidate the prediction cache without restarting the service.
+
+    Requires the X-Admin-Token header, like the /models write endpoints.
+    """
+    await prediction_cache.aclear()
+    return CacheStats(**await prediction_cache.astats())
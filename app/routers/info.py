@@ -1,5 +1,9 @@
-from fastapi import APIRouter
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from app.config import settings
 from app.models.schemas import ModelInfo
+from app.services.inference import model_details
+from app.services.model_registry import model_registry
 
 router = APIRouter(prefix="", tags=["Info"])
 
@@ -8,7 +12,7 @@ router = APIRouter(prefix="", tags=["Info"])
     "/info",
     response_model=ModelInfo,
     summary="Get Model Information",
-    description="Retrieve configuration and metadata about the ensemble model",
+    description="Retrieve configuration and metadata about the model actually being served",
     responses={
         200: {
             "description": "Model information retrieved successfully",
@@ -19,25 +23,45 @@ router = APIRouter(prefix="", tags=["Info"])
                         "model": "RandomForestClassifier",
                         "n_estimators": 50,
                         "max_features": "sqrt",
-                        "max_depth": 8
+                        "max_depth": None,
+                        "version": "997fbde1526d",
+                        "artifact": "model.srf",
+                        "sha256": "997fbde1526d4ebb3894ec912a162f578b49583a7cfa7542393feda6477c5147",
+                        "classes": [0, 1, 2],
+                        "n_trees": 50,
+                        "node_count": 1096,
+                        "depth": 10,
+                        "memory_bytes": 54304,
+                        "memory_mapped": True,
+                        "load_seconds": 0.0007,
+                        "oob_score": 0.905,
+                        "metrics": {"accuracy": 0.917, "f1": 0.917}
                     }
                 }
             }
-        }
+        },
+        404: {"description": "Unknown X-Model-Version"}
     }
 )
-async def info() -> ModelInfo:
+async def info(request: Request) -> ModelInfo:
     """
     Get detailed information about the machine learning model.
-    
+
+    Describes the active version, or the one named in X-Model-Version. Every
+    value is computed once when the version is loaded.
+
     Returns:
-        ModelInfo: Configuration details including team identifier,
-                   model type, and hyperparameters.
+        ModelInfo: Team and model type from Settings, plus the live model's
+                   hyperparameters, size, load time, hash and stored metrics.
     """
+    try:
+        entry = model_registry.get(request.headers.get("x-model-version"))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Versión de modelo no encontrada")
+    details = await asyncio.to_thread(model_details, entry.key)
     return ModelInfo(
-        team="pi",
-        model="RandomForestClassifier",
-        n_estimators=50,
-        max_features="sqrt",
-        max_depth=8
-    )
\ No newline at end of file
+        team=settings.model_team,
+        model=settings.model_type,
+        **details["params"],
+        **{k: v for k, v in details.items() if k != "params"}
+    )
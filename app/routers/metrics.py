@@ -0,0 +1,30 @@
+import asyncio
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.cache import prediction_cache
+from app.services.metrics import registry
+
+router = APIRouter(prefix="", tags=["Health"])
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus Metrics",
+    description="Expose request latency histograms, per-stage prediction timings, cache and model metrics",
+    responses={
+        200: {
+            "description": "Metrics in the Prometheus text exposition format",
+            "content": {"text/plain": {}}
+        }
+    }
+)
+async def metrics() -> PlainTextResponse:
+    """
+    Scrape endpoint for Prometheus.
+
+    Values are per worker process; scrape every worker or aggregate upstream.
+    """
+    # The collectors query the cache; a disk-backed one must not block the event loop
+    body = await asyncio.to_thread(registry.render) if prediction_cache.blocking else registry.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,135 @@
+import os
+import secrets
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from app.config import settings
+from app.models.schemas import ModelLoadRequest, ModelVersionInfo
+from app.services.log import logger
+from app.services.model_registry import ModelEntry, model_registry
+from app.services.warmup import PROJECT_DIR
+
+router = APIRouter(prefix="/models", tags=["Models"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are disabled unless MODEL_ADMIN_TOKEN is set"""
+    if not settings.model_admin_token:
+        raise HTTPException(status_code=403, detail="Administración de modelos deshabilitada")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.model_admin_token):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+
+def require_mutable_registry():
+    """One worker's registry is not shared with its siblings; restart them instead"""
+    if not model_registry.mutable:
+        raise HTTPException(
+            status_code=409,
+            detail="Con varios workers se reemplaza el artefacto y se envía SIGHUP al proceso maestro"
+        )
+
+
+def _info(entry: ModelEntry) -> ModelVersionInfo:
+    return ModelVersionInfo(
+        version=entry.version,
+        path=entry.key.path,
+        active=entry.version == model_registry.active_version,
+        in_flight=entry.in_flight,
+        loaded_at=entry.loaded_at,
+        warmup_seconds=entry.warmup_seconds,
+        cached_rows=entry.cached_rows
+    )
+
+
+@router.get(
+    "",
+    response_model=List[ModelVersionInfo],
+    summary="List Model Versions",
+    description="Model versions registered in this worker and which one is active"
+)
+async def list_models() -> List[ModelVersionInfo]:
+    """
+    List the registered model versions.
+    """
+    return [_info(entry) for entry in model_registry.entries()]
+
+
+@router.post(
+    "",
+    response_model=ModelVersionInfo,
+    dependencies=[Depends(require_admin), Depends(require_mutable_registry)],
+    summary="Load Model Version",
+    description="Load an artifact, warm it in the inference pool and optionally activate it",
+    responses={
+        400: {"description": "The artifact could not be loaded"},
+        401: {"description": "Invalid admin token"},
+        403: {"description": "Admin endpoints disabled"},
+        404: {"description": "Artifact not found"},
+        409: {"description": "Served by several pre-fork workers; use a rolling restart"}
+    }
+)
+async def load_model_version(body: ModelLoadRequest) -> ModelVersionInfo:
+    """
+    Register a new model version without restarting the service.
+
+    The version only starts receiving default traffic after it is warm, so the
+    switch causes no latency spike. It can also be targeted with X-Model-Version.
+    """
+    path = body.path if os.path.isabs(body.path) else os.path.join(PROJECT_DIR, body.path)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Artefacto no encontrado")
+    try:
+        entry = await model_registry.load(path, activate=body.activate)
+    except Exception:
+        logger.exception("Error loading model version", extra={"path": path})
+        raise HTTPException(status_code=400, detail="No se pudo cargar el artefacto")
+    return _info(entry)
+
+
+@router.post(
+    "/{version}/activate",
+    response_model=ModelVersionInfo,
+    dependencies=[Depends(require_admin), Depends(require_mutable_registry)],
+    summary="Activate Model Version",
+    description="Atomically switch the default model version for new requests",
+    responses={
+        401: {"description": "Invalid admin token"},
+        403: {"description": "Admin endpoints disabled"},
+        404: {"description": "Unknown version"},
+        409: {"description": "Served by several pre-fork workers; use a rolling restart"}
+    }
+)
+async def activate_model_version(version: str) -> ModelVersionInfo:
+    """
+    Activate a registered version; requests already running finish on their version.
+    """
+    try:
+        entry = await model_registry.activate(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Versión de modelo no encontrada")
+    return _info(entry)
+
+
+@router.delete(
+    "/{version}",
+    response_model=ModelVersionInfo,
+    dependencies=[Depends(require_admin), Depends(require_mutable_registry)],
+    summary="Retire Model Version",
+    description="Stop serving a version, drain its in-flight requests and drop its cached predictions",
+    responses={
+        401: {"description": "Invalid admin token"},
+        403: {"description": "Admin endpoints disabled"},
+        404: {"description": "Unknown version"},
+        409: {"description": "The version is active, or served by several pre-fork workers"}
+    }
+)
+async def retire_model_version(version: str) -> ModelVersionInfo:
+    """
+    Retire a version that is no longer active.
+    """
+    try:
+        entry = await model_registry.retire(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Versión de modelo no encontrada")
+    except ValueError:
+        raise HTTPException(status_code=409, detail="No se puede retirar la versión activa")
+    return _info(entry)
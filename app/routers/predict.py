@@ -1,55 +1,565 @@
-from fastapi import APIRouter, HTTPException
-import os
-import joblib
-import sys
-from functools import lru_cache
-from model.rf_custom import SimpleRandomForest
-from app.models.schemas import PredictionInput, PredictionResponse
-
-sys.modules['__main__'].SimpleRandomForest = SimpleRandomForest
-
-
-@lru_cache()
-def load_model():
-    """Load model once and cache it"""
-    PATH_MODEL = os.path.join(os.path.dirname(__file__), "..", "..", "model", "model.pkl")
-    model = joblib.load(PATH_MODEL)
-    print("Modelo cargado:")
-    print(model['est'])
-    return model['est']
-
-# Caché muy agresivo (1000 predicciones únicas)
-@lru_cache(maxsize=1000)
-def cached_predict(features_tuple):
-    model = load_model()
-    features = [list(features_tuple)]
-    prediction_index = model.predict(features)[0]
-    return int(prediction_index)
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+import asyncio
+import email.message
+import json
+import time
+from typing import Literal
+from app.config import settings
+from app.models.schemas import (
+    PredictionInput,
+    PredictionResponse,
+    BatchPredictionInput,
+    BatchPredictionResponse,
+    ClassScore,
+    ProbaPredictionResponse,
+)
+from app.services.admission import request_deadline
+from app.services.batcher import batcher
+from app.services.bulk import BulkFormatError, DuplexStreamingResponse, create_decoder, encode_labels, encode_proba
+from app.services.cache import prediction_cache
+from app.services.executor import DeadlineExceeded, run_inference
+from app.services.fastjson import dumps, loads
+from app.services.inference import predict_one, predict_one_proba, batch_predict, bulk_predict, load_model
+from app.services.log import logger, request_logger, should_log_request
+from app.services.metrics import mark_handler_end, mark_handler_start, observe_stage
+from app.services.model_registry import ModelEntry, model_registry
+from app.services.stream import LineSplitter, next_batch, parse_message
 
 router = APIRouter(prefix="", tags=["Predictions"])
 
 MAP_INDEX_TO_SPECIES = {0: "setosa", 1: "versicolor", 2: "virginica"}
 
-@router.post(
-    "/predict",
+def _acquire_model(request: Request) -> ModelEntry:
+    """Pin the version asked for in X-Model-Version, or the active one"""
+    try:
+        return model_registry.acquire(request.headers.get("x-model-version"))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Versión de modelo no encontrada")
+
+
+async def _resolve_index(features, started: float, entry: ModelEntry, deadline=None) -> int:
+    """Cache lookup, then inference on a miss unless the deadline passed; records the per-stage timings"""
+    features_tuple = tuple(features)
+    if should_log_request():
+        request_logger.debug("Received features", extra={"features": features_tuple, "version": entry.version})
+    prediction_index = await prediction_cache.aget(features_tuple, entry.version)
+    looked_up = time.perf_counter()
+    observe_stage("/predict", "cache_lookup", looked_up - started)
+    if prediction_index is None:
+        if batcher.running:
+            prediction_index = await batcher.submit(list(features_tuple), entry.key, deadline)
+        else:
+            prediction_index = await run_inference(predict_one, features_tuple, entry.key, deadline=deadline)
+        observe_stage("/predict", "inference", time.perf_counter() - looked_up)
+        await prediction_cache.aput(features_tuple, prediction_index, entry.version)
+    return prediction_index
+
+
+_PREDICT_ROUTE = dict(
     summary="Make Prediction",
     description="Submit data to receive a prediction from the ensemble model",
-    response_model=PredictionResponse,
     responses={
+        200: {"model": PredictionResponse, "description": "Successful Response"},
         400: {"description": "Invalid input"},
-        500: {"description": "Internal server error"}
+        404: {"description": "Unknown X-Model-Version"},
+        429: {"description": "Client rate limit exceeded"},
+        500: {"description": "Internal server error"},
+        503: {"description": "Saturated; retry after Retry-After seconds"},
+        504: {"description": "X-Request-Deadline-Ms expired before inference"}
     }
 )
-async def predict(input_data: PredictionInput) -> PredictionResponse:
+
+
+async def predict(input_data: PredictionInput, request: Request, response: Response) -> PredictionResponse:
     """
     Make a prediction using the ensemble machine learning model.
+
+    The X-Model-Version header selects a registered model version (A/B tests);
+    the version that answered is echoed back in the same header.
     """
+    started = mark_handler_start(request)
+    entry = _acquire_model(request)
     try:
-        features_tuple = tuple(input_data.features)
-        print("Received features:", features_tuple)
-        prediction_index = cached_predict(features_tuple)
+        prediction_index = await _resolve_index(input_data.features, started, entry, request_deadline(request))
         specie = MAP_INDEX_TO_SPECIES.get(prediction_index, "unknown")
+        response.headers["X-Model-Version"] = entry.version
         return PredictionResponse(prediction=specie)
-    except Exception as e:
-        print("Error during prediction:", e, file=sys.stderr)
-        raise HTTPException(status_code=500, detail=f"Error en predicción")
\ No newline at end of file
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        logger.exception("Error during prediction")
+        raise HTTPException(status_code=500, detail=f"Error en predicción")
+    finally:
+        model_registry.release(entry)
+        mark_handler_end(request)
+
+
+# Pre-serialized bodies for the fast path: one constant per species
+_FAST_RESPONSES = {
+    index: dumps({"prediction": specie}) for index, specie in MAP_INDEX_TO_SPECIES.items()
+}
+_FAST_UNKNOWN = dumps({"prediction": "unknown"})
+
+
+def _decode_features(payload):
+    """Return the 4 features if the payload is the canonical valid shape, else None"""
+    if type(payload) is not dict:
+        return None
+    features = payload.get("features")
+    if type(features) is not list or len(features) != 4:
+        return None
+    for x in features:
+        # bool is an int subclass; anything unusual goes through Pydantic instead
+        if type(x) is not float and type(x) is not int:
+            return None
+        if x < 0:
+            return None
+    return [float(x) for x in features]
+
+
+def _is_json(request: Request) -> bool:
+    """Whether FastAPI would parse this body as JSON: application/json or a +json subtype"""
+    content_type = request.headers.get("content-type")
+    if not content_type:
+        return False
+    message = email.message.Message()
+    message["content-type"] = content_type
+    if message.get_content_maintype() != "application":
+        return False
+    subtype = message.get_content_subtype()
+    return subtype == "json" or subtype.endswith("+json")
+
+
+def _parse_json(body: bytes):
+    """Decode a JSON body, raising the errors FastAPI reports"""
+    try:
+        # The stdlib parser, so decode errors carry the same messages FastAPI reports
+        return json.loads(body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": ("body", e.pos),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": e.msg}
+        }])
+    except Exception:
+        raise HTTPException(status_code=400, detail="There was an error parsing the body")
+
+
+def _validate_slow(body: bytes, is_json: bool = True):
+    """Full Pydantic validation, raising the same 422 errors as the regular route"""
+    missing = RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}])
+    if not body:
+        raise missing
+    if not is_json:
+        # FastAPI hands any other content type to the model as raw bytes
+        payload = body
+    else:
+        payload = _parse_json(body)
+        # FastAPI treats a JSON null body like an absent one
+        if payload is None:
+            raise missing
+    try:
+        return PredictionInput.model_validate(payload, from_attributes=True).features
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body",) + tuple(error["loc"])} for error in e.errors(include_url=False)
+        ])
+
+
+async def predict_fast(request: Request) -> Response:
+    """
+    Make a prediction decoding the body directly, without building Pydantic models.
+
+    Same validation rules and error responses as the regular route.
+    """
+    body = await request.body()
+    is_json = _is_json(request)
+    features = None
+    if is_json:
+        try:
+            features = _decode_features(loads(body))
+        except ValueError:
+            pass
+    if features is None:
+        features = _validate_slow(body, is_json)
+    started = mark_handler_start(request)
+    entry = _acquire_model(request)
+    try:
+        prediction_index = await _resolve_index(features, started, entry, request_deadline(request))
+        return Response(
+            content=_FAST_RESPONSES.get(prediction_index, _FAST_UNKNOWN),
+            media_type="application/json",
+            headers={"X-Model-Version": entry.version}
+        )
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        logger.exception("Error during prediction")
+        raise HTTPException(status_code=500, detail=f"Error en predicción")
+    finally:
+        model_registry.release(entry)
+        mark_handler_end(request)
+
+
+if settings.fast_path_enabled:
+    router.post(
+        "/predict",
+        response_model=None,
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {"application/json": {"schema": PredictionInput.model_json_schema()}}
+            }
+        },
+        **_PREDICT_ROUTE
+    )(predict_fast)
+else:
+    router.post("/predict", response_model=PredictionResponse, **_PREDICT_ROUTE)(predict)
+
+
+@router.post(
+    "/predict/batch",
+    summary="Make Batch Prediction",
+    description="Submit several rows at once and receive one prediction per row, in order",
+    response_model=BatchPredictionResponse,
+    responses={
+        400: {"description": "Invalid input"},
+        404: {"description": "Unknown X-Model-Version"},
+        429: {"description": "Client rate limit exceeded"},
+        500: {"description": "Internal server error"},
+        503: {"description": "Saturated; retry after Retry-After seconds"},
+        504: {"description": "X-Request-Deadline-Ms expired before inference"}
+    }
+)
+async def predict_batch(
+    input_data: BatchPredictionInput,
+    request: Request,
+    response: Response
+) -> BatchPredictionResponse:
+    """
+    Make predictions for N rows with a single pass over the forest.
+    """
+    started = mark_handler_start(request)
+    entry = _acquire_model(request)
+    try:
+        indices = await run_inference(
+            batch_predict, input_data.instances, entry.key, deadline=request_deadline(request)
+        )
+        observe_stage("/predict/batch", "inference", time.perf_counter() - started)
+        species = [MAP_INDEX_TO_SPECIES.get(i, "unknown") for i in indices]
+        response.headers["X-Model-Version"] = entry.version
+        return BatchPredictionResponse(predictions=species)
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        logger.exception("Error during batch prediction")
+        raise HTTPException(status_code=500, detail=f"Error en predicción")
+    finally:
+        model_registry.release(entry)
+        mark_handler_end(request)
+
+
+@router.post(
+    "/predict/proba",
+    summary="Predict With Probabilities",
+    description="Return the label together with the class probabilities and the top-k species",
+    response_model=ProbaPredictionResponse,
+    responses={
+        400: {"description": "Invalid input"},
+        404: {"description": "Unknown X-Model-Version"},
+        429: {"description": "Client rate limit exceeded"},
+        500: {"description": "Internal server error"},
+        503: {"description": "Saturated; retry after Retry-After seconds"},
+        504: {"description": "X-Request-Deadline-Ms expired before inference"}
+    }
+)
+async def predict_proba(
+    input_data: PredictionInput,
+    request: Request,
+    response: Response,
+    top_k: int = Query(3, ge=1, description="Number of species to rank")
+) -> ProbaPredictionResponse:
+    """
+    Make a prediction with confidences from a single pass over the forest.
+
+    Probabilities are gathered from the per-leaf class distributions precomputed
+    in the compiled forest; the label is the same majority vote as /predict.
+    """
+    started = mark_handler_start(request)
+    entry = _acquire_model(request)
+    try:
+        prediction_index, proba = await run_inference(
+            predict_one_proba, tuple(input_data.features), entry.key, deadline=request_deadline(request)
+        )
+        observe_stage("/predict/proba", "inference", time.perf_counter() - started)
+        species = [MAP_INDEX_TO_SPECIES.get(int(c), "unknown") for c in load_model(entry.key).classes_]
+        response.headers["X-Model-Version"] = entry.version
+        probabilities = dict(zip(species, proba))
+        ranked = sorted(zip(species, proba), key=lambda item: -item[1])[:top_k]
+        return ProbaPredictionResponse(
+            prediction=MAP_INDEX_TO_SPECIES.get(prediction_index, "unknown"),
+            probabilities=probabilities,
+            top_k=[ClassScore(label=label, probability=p) for label, p in ranked]
+        )
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        logger.exception("Error during probability prediction")
+        raise HTTPException(status_code=500, detail=f"Error en predicción")
+    finally:
+        model_registry.release(entry)
+        mark_handler_end(request)
+
+
+@router.post(
+    "/predict/bulk",
+    summary="Bulk Scoring",
+    description="Stream a .npy matrix or a CSV file through the model and stream back one result per row",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/csv": {}}, "description": "One line per row: species, or class probabilities"},
+        400: {"description": "Invalid header or first block of rows"},
+        404: {"description": "Unknown X-Model-Version"},
+        415: {"description": "Unsupported Content-Type"}
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string", "format": "binary"}},
+                "application/x-npy": {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+)
+async def predict_bulk(request: Request, output: Literal["labels", "proba"] = "labels") -> StreamingResponse:
+    """
+    Score an arbitrarily large upload without holding it in memory.
+
+    The body is decoded in blocks of ``bulk_chunk_rows`` rows, each block goes through
+    the forest in one pass and its results are written out before the next one is read.
+    Rows follow the /predict rules (4 finite, non-negative features). An invalid header
+    or first block is a 400; a later invalid block ends the response with an
+    ``error,<reason>`` line after the rows scored so far.
+    """
+    decoder = create_decoder(request.headers.get("content-type"), settings.bulk_chunk_rows)
+    if decoder is None:
+        raise HTTPException(status_code=415, detail="Use text/csv or application/x-npy")
+
+    # Decode the header and first block before answering, so early errors still get a 400
+    body = request.stream()
+    pending, finished = [], False
+    try:
+        while not pending:
+            try:
+                data = await body.__anext__()
+            except StopAsyncIteration:
+                pending.extend(decoder.close())
+                finished = True
+                break
+            pending.extend(decoder.feed(data))
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Held until the last block is written, so retiring this version waits for the upload
+    entry = _acquire_model(request)
+    try:
+        model = await asyncio.to_thread(load_model, entry.key)
+    except Exception:
+        model_registry.release(entry)
+        logger.exception("Error loading model for bulk prediction")
+        raise HTTPException(status_code=500, detail=f"Error en predicción")
+    proba = output == "proba"
+    species = [MAP_INDEX_TO_SPECIES.get(int(c), "unknown") for c in model.classes_]
+    labels = {int(c): f"{name}\n".encode() for c, name in zip(model.classes_, species)}
+    header = ",".join(species) if proba else "prediction"
+
+    async def score(block):
+        result = await run_inference(bulk_predict, block, proba, entry.key)
+        return encode_proba(result) if proba else encode_labels(result, labels)
+
+    async def results():
+        yield f"{header}\n".encode()
+        try:
+            for block in pending:
+                yield await score(block)
+            pending.clear()
+            if not finished:
+                async for data in body:
+                    for block in decoder.feed(data):
+                        yield await score(block)
+                for block in decoder.close():
+                    yield await score(block)
+        except BulkFormatError as e:
+            # Headers are already sent: the trailer tells the client where scoring stopped
+            logger.warning("Invalid bulk upload", extra={"rows": decoder.rows, "reason": str(e)})
+            yield f"error,{' '.join(str(e).split())}\n".encode()
+        except Exception:
+            # Headers are already sent; abort so the client sees a truncated response
+            logger.exception("Error during bulk prediction", extra={"rows": decoder.rows})
+            raise
+        finally:
+            model_registry.release(entry)
+            # The handler's work is the whole upload, not just building the response
+            mark_handler_end(request)
+
+    return DuplexStreamingResponse(results(), media_type="text/csv", headers={"X-Model-Version": entry.version})
+
+
+async def _score_stream(raw_messages, version) -> list:
+    """Score one batch of stream messages in a single forest pass; one encoded result per message"""
+    started = time.perf_counter()
+    messages = [parse_message(raw) for raw in raw_messages]
+    results = [None] * len(messages)
+    try:
+        entry = model_registry.acquire(version)
+    except KeyError:
+        entry = None
+    try:
+        valid = []
+        for i, message in enumerate(messages):
+            if message.error is not None or entry is None:
+                error = message.error or "Versión de modelo no encontrada"
+                results[i] = {"error": error} if message.id is None else {"id": message.id, "error": error}
+            else:
+                valid.append(i)
+        misses = []
+        if valid:
+            cached = await prediction_cache.aget_many([messages[i].features for i in valid], entry.version)
+            for i, index in zip(valid, cached):
+                if index is None:
+                    misses.append(i)
+                else:
+                    results[i] = index
+        if misses:
+            rows = [messages[i].features for i in misses]
+            indices = await run_inference(batch_predict, [list(row) for row in rows], entry.key)
+            await prediction_cache.aput_many(rows, indices, entry.version)
+            for i, index in zip(misses, indices):
+                results[i] = index
+            observe_stage("/predict/stream", "inference", time.perf_counter() - started)
+    finally:
+        if entry is not None:
+            model_registry.release(entry)
+
+    encoded = []
+    for message, result in zip(messages, results):
+        if isinstance(result, int):
+            result = {"prediction": MAP_INDEX_TO_SPECIES.get(result, "unknown")}
+            if message.id is not None:
+                result = {"id": message.id, **result}
+        encoded.append(dumps(result))
+    return encoded
+
+
+@router.websocket("/predict/stream")
+async def predict_stream_ws(websocket: WebSocket):
+    """
+    Persistent prediction channel for clients sending a steady stream of rows.
+
+    Each text frame is {"id": ..., "features": [...]}; each reply is
+    {"id": ..., "prediction": ...} (or {"id": ..., "error": ...}), in the order
+    the rows arrived. Rows that queue up while the forest is busy are scored
+    together in one pass, up to ``stream_max_batch``. X-Model-Version on the
+    handshake pins a version for the whole connection.
+    """
+    version = websocket.headers.get("x-model-version")
+    try:
+        model_registry.get(version)
+    except KeyError:
+        await websocket.close(code=1008, reason="Versión de modelo no encontrada")
+        return
+    await websocket.accept()
+
+    # Bounded, so a client sending faster than we score is slowed down by TCP backpressure
+    queue = asyncio.Queue(maxsize=settings.stream_max_batch * 4)
+
+    async def receive():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                await queue.put(message.get("text") or message.get("bytes") or "")
+        finally:
+            # Never wait here: the consumer may already be gone. Rows still queued
+            # cannot be answered after a disconnect, so make room for the end marker
+            while True:
+                try:
+                    queue.put_nowait(None)
+                    break
+                except asyncio.QueueFull:
+                    queue.get_nowait()
+
+    reader = asyncio.create_task(receive())
+    try:
+        closed = False
+        while not closed:
+            batch, closed = await next_batch(queue, settings.stream_max_batch)
+            if batch:
+                for result in await _score_stream(batch, version):
+                    await websocket.send_text(result.decode())
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Error during stream prediction")
+        await websocket.close(code=1011)
+    finally:
+        reader.cancel()
+
+
+@router.post(
+    "/predict/stream",
+    summary="Streaming Prediction (NDJSON)",
+    description="Send newline-delimited rows and receive newline-delimited predictions as they are scored",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}, "description": "One JSON line per input line, in order"},
+        404: {"description": "Unknown X-Model-Version"},
+        429: {"description": "Client rate limit exceeded"},
+        503: {"description": "Saturated; retry after Retry-After seconds"},
+        504: {"description": "X-Request-Deadline-Ms expired before the stream started"}
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}}}
+        }
+    }
+)
+async def predict_stream_ndjson(request: Request) -> StreamingResponse:
+    """
+    HTTP alternative to the WebSocket channel for clients that cannot upgrade.
+
+    Same message format, one JSON object per line. The rows of every received
+    chunk are scored together and their results are written back before the
+    next chunk is read, so a chunked upload gets answers while it is still sending.
+    """
+    mark_handler_start(request)
+    version = request.headers.get("x-model-version")
+    try:
+        entry = model_registry.get(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Versión de modelo no encontrada")
+    splitter = LineSplitter()
+    max_batch = settings.stream_max_batch
+
+    async def results():
+        try:
+            async for data in request.stream():
+                lines = splitter.feed(data)
+                for start in range(0, len(lines), max_batch):
+                    yield b"\n".join(await _score_stream(lines[start:start + max_batch], version)) + b"\n"
+            lines = splitter.close()
+            if lines:
+                yield b"\n".join(await _score_stream(lines, version)) + b"\n"
+        finally:
+            # The handler's work is the whole stream, not just building the response
+            mark_handler_end(request)
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson", headers={"X-Model-Version": entry.version})
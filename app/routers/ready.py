@@ -0,0 +1,53 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.models.schemas import ReadinessResponse
+from app.services.warmup import readiness
+
+router = APIRouter(prefix="", tags=["Health"])
+
+
+@router.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    summary="Readiness Check",
+    description="Report whether the model is loaded and warm; load balancers should only route to ready workers",
+    responses={
+        200: {
+            "description": "Model loaded, warmed up and cache pre-populated",
+            "content": {
+                "application/json": {
+                    "example": {"status": "ready", "warmup_seconds": 0.12, "cached_rows": 120}
+                }
+            }
+        },
+        503: {
+            "description": "Warm-up still in progress or failed",
+            "content": {
+                "application/json": {
+                    "example": {"status": "warming", "warmup_seconds": None, "cached_rows": 0}
+                }
+            }
+        }
+    }
+)
+async def ready():
+    """
+    Check whether this worker is ready to receive prediction traffic.
+
+    Unlike /health, which only confirms the process is up, this returns 503
+    until the startup warm-up has finished.
+    """
+    if readiness.ready:
+        status = "ready"
+    elif readiness.error is not None:
+        status = "failed"
+    else:
+        status = "warming"
+    body = ReadinessResponse(
+        status=status,
+        warmup_seconds=readiness.warmup_seconds,
+        cached_rows=readiness.cached_rows
+    )
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=body.model_dump())
+    return body
@@ -0,0 +1,286 @@
+"""
+Production launcher: a pre-fork master in front of N uvicorn workers.
+
+The master imports the application, loads and warms the startup model and
+freezes the garbage collector before forking, so every worker shares the
+model's pages copy-on-write instead of unpickling its own copy. All workers
+accept on one listening socket created by the master.
+
+Signals sent to the master:
+    SIGTERM / SIGINT  graceful shutdown: workers stop accepting and drain
+    SIGHUP            rolling restart, one worker at a time; if the startup
+                      artifact changed on disk it is reloaded in the master first
+    SIGUSR1           log the resident memory of every worker now
+
+Usage (Linux/macOS; os.fork is required):
+    python -m app.server --port 8000 --workers 4
+"""
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import uvicorn
+from app.config import settings
+from app.main import app
+from app.services.executor import available_cpus, set_sibling_processes
+from app.services.inference import ModelKey, default_key, file_version, load_model, predict_one, unload_model
+from app.services.log import logger, setup_logging
+from app.services.metrics import process_memory
+from app.services.model_registry import model_registry
+from app.services.warmup import readiness
+
+
+class Worker:
+    """A forked uvicorn process and the pipe it reports readiness on"""
+
+    def __init__(self, pid: int, ready_fd: int):
+        self.pid = pid
+        self.ready_fd = ready_fd
+        self.started_at = time.time()
+        self.ready = False
+
+
+class Master:
+    """Preloads the model, forks the workers and supervises them"""
+
+    def __init__(self, host: str, port: int, workers: int, timeout_keep_alive: int):
+        self.host = host
+        self.port = port
+        self.n_workers = workers
+        self.timeout_keep_alive = timeout_keep_alive
+        self.graceful_timeout = settings.server_graceful_timeout_seconds
+        self.workers = {}
+        self.key = None
+        self.sock = None
+        self._retired = set()
+        self._signals = []
+
+    # Master side
+
+    def preload(self):
+        """Load the startup model once, touch it, and keep it out of the collector's reach"""
+        path = model_registry.startup_path()
+        key = ModelKey(path, file_version(path))
+        load_model(key)
+        # One prediction pages in every array the workers will read
+        predict_one((0.0, 0.0, 0.0, 0.0), key)
+        if self.key is not None and self.key != key:
+            unload_model(self.key)
+            default_key.cache_clear()
+        self.key = key
+        # Objects that exist now are never scanned again, so the collector does not dirty shared pages
+        gc.collect()
+        gc.freeze()
+        logger.info("Model preloaded in master", extra={"version": key.version, "path": path})
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.sock = sock
+
+    def spawn(self) -> Worker:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            code = 0
+            try:
+                self._run_worker(write_fd)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        worker = Worker(pid, read_fd)
+        self.workers[pid] = worker
+        logger.info("Worker started", extra={"pid": pid})
+        return worker
+
+    def wait_ready(self, worker: Worker, timeout: float) -> bool:
+        """Block until the worker reports it is warm, it fails, or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        while not worker.ready:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([worker.ready_fd], [], [], min(remaining, 0.5))
+            if readable:
+                worker.ready = os.read(worker.ready_fd, 1) == b"1"
+                return worker.ready
+            self.reap()
+            if worker.pid not in self.workers:
+                return False
+        return True
+
+    def stop(self, worker: Worker, sig=signal.SIGTERM):
+        try:
+            os.kill(worker.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def reap(self, respawn: bool = False):
+        """Collect exited workers; with respawn, replace the ones that died unexpectedly"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            code = os.waitstatus_to_exitcode(status)
+            # Retired workers exit on their own; anything else leaving the set is a crash
+            if pid in self._retired:
+                self._retired.discard(pid)
+                logger.info("Retired worker exited", extra={"pid": pid, "exit_code": code})
+                continue
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker.ready_fd)
+            if not respawn:
+                logger.info("Worker exited", extra={"pid": pid, "exit_code": code})
+                continue
+            logger.warning("Worker exited unexpectedly, respawning", extra={"pid": pid, "exit_code": code})
+            # Do not spin if workers die right after starting
+            if time.time() - worker.started_at < 1.0:
+                time.sleep(1.0)
+            self.spawn()
+
+    def rolling_restart(self):
+        """Replace every worker, starting each new one before stopping an old one"""
+        path = model_registry.startup_path()
+        if file_version(path) != self.key.version:
+            self.preload()
+        for old in list(self.workers.values()):
+            new = self.spawn()
+            if not self.wait_ready(new, self.graceful_timeout):
+                logger.error("Replacement worker not ready, restart aborted", extra={"pid": new.pid})
+                if self.workers.pop(new.pid, None) is not None:
+                    os.close(new.ready_fd)
+                    self._retired.add(new.pid)
+                self.stop(new, signal.SIGKILL)
+                return
+            # Removed from the set first so its exit is not mistaken for a crash
+            if self.workers.pop(old.pid, None) is None:
+                continue
+            os.close(old.ready_fd)
+            self._retired.add(old.pid)
+            self.stop(old)
+        logger.info("Rolling restart complete", extra={"workers": len(self.workers), "version": self.key.version})
+
+    def report_memory(self):
+        """Log resident and proportional memory per worker; PSS splits shared pages between processes"""
+        processes = [("master", os.getpid())] + [("worker", pid) for pid in sorted(self.workers)]
+        total_pss = 0
+        for role, pid in processes:
+            memory = process_memory(pid)
+            total_pss += memory.get("pss", 0)
+            logger.info("Process memory", extra={"role": role, "pid": pid, **{
+                f"{kind}_mb": round(value / 2**20, 1) for kind, value in memory.items()
+            }})
+        if total_pss:
+            logger.info("Total memory", extra={"pss_mb": round(total_pss / 2**20, 1), "processes": len(processes)})
+
+    def shutdown(self):
+        logger.info("Shutting down workers", extra={"workers": len(self.workers)})
+        for worker in self.workers.values():
+            self.stop(worker)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for worker in self.workers.values():
+            logger.warning("Worker did not drain in time, killing it", extra={"pid": worker.pid})
+            self.stop(worker, signal.SIGKILL)
+        while self.workers:
+            self.reap()
+            time.sleep(0.05)
+
+    def run(self):
+        setup_logging(background=False)
+        # Inherited by the workers: their registries are separate, so /models writes are refused
+        model_registry.workers = self.n_workers
+        # and each inference pool gets its share of the CPUs instead of all of them
+        set_sibling_processes(self.n_workers)
+        self.preload()
+        self.bind()
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+            signal.signal(sig, lambda signum, _: self._signals.append(signum))
+
+        for _ in range(self.n_workers):
+            self.spawn()
+        for worker in list(self.workers.values()):
+            if not self.wait_ready(worker, self.graceful_timeout):
+                logger.warning("Worker not ready after startup timeout", extra={"pid": worker.pid})
+        logger.info("Serving", extra={"host": self.host, "port": self.port, "workers": len(self.workers)})
+        self.report_memory()
+
+        next_report = time.monotonic() + settings.server_memory_report_seconds
+        while True:
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.shutdown()
+                    return
+                if signum == signal.SIGHUP:
+                    self.rolling_restart()
+                elif signum == signal.SIGUSR1:
+                    self.report_memory()
+            self.reap(respawn=True)
+            if settings.server_memory_report_seconds > 0 and time.monotonic() >= next_report:
+                self.report_memory()
+                next_report = time.monotonic() + settings.server_memory_report_seconds
+            time.sleep(0.2)
+
+    # Worker side
+
+    def _run_worker(self, ready_fd: int):
+        for worker in self.workers.values():
+            os.close(worker.ready_fd)
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+            signal.signal(sig, signal.SIG_DFL)
+        # Restarts are the master's job
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        threading.Thread(target=self._notify_ready, args=(ready_fd,), daemon=True).start()
+        config = uvicorn.Config(
+            app,
+            timeout_keep_alive=self.timeout_keep_alive,
+            timeout_graceful_shutdown=int(self.graceful_timeout),
+            log_level=settings.log_level.lower(),
+            # Requests are logged by the app's queue-based logger, not synchronously by uvicorn
+            access_log=False,
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    @staticmethod
+    def _notify_ready(ready_fd: int):
+        # Readiness is set by the application's startup warm-up
+        while not readiness.ready and readiness.error is None:
+            time.sleep(0.05)
+        os.write(ready_fd, b"1" if readiness.ready else b"0")
+        os.close(ready_fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork production server for the Ensamble API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=settings.server_workers or available_cpus())
+    parser.add_argument("--timeout-keep-alive", type=int, default=30)
+    args = parser.parse_args()
+    if not hasattr(os, "fork"):
+        sys.exit("app.server requires os.fork; use uvicorn app.main:app on this platform")
+    Master(args.host, args.port, args.workers, args.timeout_keep_alive).run()
+
+
+if __name__ == "__main__":
+    main()
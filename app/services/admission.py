@@ -0,0 +1,267 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection, Request
+from app.config import settings
+from app.services.metrics import ADMISSION_QUEUED, ADMISSION_REJECTED, observe_stage
+
+
+class TokenBucket:
+    """
+    Per-client token buckets refilled at ``rate`` tokens per second up to ``burst``.
+
+    Only the most recently seen ``max_clients`` clients are tracked; a client
+    that was evicted starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+
+    def take(self, client: str, now: Optional[float] = None) -> float:
+        """Spend one token; return 0 if allowed, else the seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        tokens, last = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class Ticket:
+    """An admitted request and its absolute deadline on the monotonic clock"""
+
+    def __init__(self, deadline: Optional[float]):
+        self.deadline = deadline
+        self.holds_slot = False
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the client gives up, or None without a deadline"""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+class AdmissionController:
+    """
+    Bound the prediction work a worker accepts instead of queueing without limit.
+
+    At most ``max_in_flight`` requests run at once and at most ``max_queue``
+    wait for a slot; anything beyond that is answered immediately with 503
+    and ``Retry-After``. Each request carries a deadline (the
+    ``X-Request-Deadline-Ms`` budget or ``request_deadline_ms``) counted from
+    its arrival; a request whose deadline passes while it waits is dropped
+    with 504 before any inference runs, since nobody is waiting for the
+    answer. An optional per-client token bucket answers 429 first.
+    """
+
+    DEADLINE_HEADER = "x-request-deadline-ms"
+
+    def __init__(self, max_in_flight: int, max_queue: int, default_deadline_ms: float,
+                 rate: float, burst: int, retry_after: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.default_deadline_ms = default_deadline_ms
+        self.retry_after = retry_after
+        self.buckets = TokenBucket(rate, burst) if rate > 0 else None
+        self.in_flight = 0
+        self.queued = 0
+        self._slots = None
+
+    @property
+    def limited(self) -> bool:
+        return self.max_in_flight > 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the serving event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self._slots
+
+    @staticmethod
+    def client_id(request: HTTPConnection) -> str:
+        """X-Client-Id if the caller sends one, else the first forwarded address or the peer"""
+        client = request.headers.get("x-client-id")
+        if client:
+            return client
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    def deadline(self, request: HTTPConnection) -> Optional[float]:
+        """Absolute monotonic deadline, counted from when the request arrived"""
+        header = request.headers.get(self.DEADLINE_HEADER)
+        if header is None:
+            # A default of 0 means requests without the header have no deadline
+            if self.default_deadline_ms <= 0:
+                return None
+            budget_ms = self.default_deadline_ms
+        else:
+            try:
+                budget_ms = float(header)
+            except ValueError:
+                budget_ms = math.nan
+            if not math.isfinite(budget_ms):
+                raise HTTPException(status_code=400, detail="X-Request-Deadline-Ms debe ser un número")
+        # The metrics middleware stamps arrival with perf_counter; translate it to the monotonic clock
+        arrived = request.scope.get("state", {}).get("metrics_start")
+        waited = time.perf_counter() - arrived if arrived is not None else 0.0
+        return time.monotonic() - waited + budget_ms / 1000
+
+    def _reject(self, reason: str, status_code: int, detail: str, retry_after: Optional[float] = None):
+        ADMISSION_REJECTED.inc(reason)
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after is not None else None
+        raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+    async def acquire(self, request: HTTPConnection) -> Ticket:
+        """Admit a request, waiting for a slot if needed, or raise 429/503/504"""
+        if self.buckets is not None:
+            wait = self.buckets.take(self.client_id(request))
+            if wait > 0:
+                self._reject("rate_limited", 429, "Demasiadas peticiones", wait)
+
+        ticket = Ticket(self.deadline(request))
+        if ticket.expired:
+            self._reject("expired", 504, "Plazo de la petición vencido")
+        if not self.limited:
+            return ticket
+
+        waiting_since = time.perf_counter()
+        slots = self._semaphore()
+        if slots.locked():
+            if self.queued >= self.max_queue:
+                self._reject("saturated", 503, "Servicio saturado", self.retry_after)
+            self.queued += 1
+            ADMISSION_QUEUED.set(self.queued)
+            try:
+                await asyncio.wait_for(slots.acquire(), ticket.remaining())
+            except asyncio.TimeoutError:
+                self._reject("expired", 504, "Plazo de la petición vencido")
+            finally:
+                self.queued -= 1
+                ADMISSION_QUEUED.set(self.queued)
+        else:
+            await slots.acquire()
+        ticket.holds_slot = True
+        self.in_flight += 1
+        observe_stage(request.url.path, "admission", time.perf_counter() - waiting_since)
+
+        # Waiting for the slot may have used up the budget: drop it before doing any work
+        if ticket.expired:
+            self.release(ticket)
+            self._reject("expired", 504, "Plazo de la petición vencido")
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Give back the slot held by an admitted request"""
+        if ticket.holds_slot:
+            ticket.holds_slot = False
+            self.in_flight -= 1
+            self._slots.release()
+
+
+admission = AdmissionController(
+    max_in_flight=settings.admission_max_in_flight,
+    max_queue=settings.admission_max_queue,
+    default_deadline_ms=settings.request_deadline_ms,
+    rate=settings.rate_limit_per_second,
+    burst=settings.rate_limit_burst,
+    retry_after=settings.admission_retry_after_seconds,
+)
+
+# Streams hold their slot for the whole connection, so they are counted apart from
+# the short requests: no queue, and no default deadline over a connection's life
+stream_admission = AdmissionController(
+    max_in_flight=settings.stream_max_connections,
+    max_queue=0,
+    default_deadline_ms=0.0,
+    rate=settings.rate_limit_per_second,
+    burst=settings.rate_limit_burst,
+    retry_after=settings.admission_retry_after_seconds,
+)
+
+
+def request_deadline(request: Request) -> Optional[float]:
+    """Monotonic deadline the admission middleware set for this request, if any"""
+    return request.scope.get("state", {}).get("deadline")
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware gating the prediction routes.
+
+    Runs before the body is read and validated, so a rejected request costs
+    almost nothing. The slot is held until the response has been sent. The
+    ticket's deadline is left in ``scope["state"]["deadline"]`` (see
+    ``request_deadline``) so the work is dropped if it expires later.
+
+    Streams (``/predict/stream``, WebSocket or NDJSON body) go through their
+    own controller, admitted once per connection and holding a stream slot
+    until it closes, so long-lived connections never take the slots of the
+    short requests. A rejected WebSocket is closed with 1013 (try again
+    later) before the handshake is accepted.
+    """
+
+    PATHS = frozenset({"/predict", "/predict/batch", "/predict/proba"})
+    STREAM_PATHS = frozenset({"/predict/stream"})
+
+    def __init__(self, app, controller: AdmissionController = admission,
+                 stream_controller: AdmissionController = stream_admission):
+        self.app = app
+        self.controller = controller
+        self.stream_controller = stream_controller
+
+    def _controller(self, scope) -> Optional[AdmissionController]:
+        """The controller gating this connection, or None if it is not gated"""
+        if scope["type"] == "http" and scope["method"] == "POST":
+            if scope["path"] in self.PATHS:
+                return self.controller
+            if scope["path"] in self.STREAM_PATHS:
+                return self.stream_controller
+        if scope["type"] == "websocket" and scope["path"] in self.STREAM_PATHS:
+            return self.stream_controller
+        return None
+
+    async def __call__(self, scope, receive, send):
+        controller = self._controller(scope)
+        if controller is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            ticket = await controller.acquire(HTTPConnection(scope))
+        except HTTPException as exc:
+            if scope["type"] == "websocket":
+                # Closing before accept rejects the handshake
+                await receive()
+                await send({"type": "websocket.close", "code": 1013, "reason": str(exc.detail)})
+                return
+            response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+            await response(scope, receive, send)
+            return
+        # Handlers check it again right before inference (run_inference, the batcher)
+        state = scope.setdefault("state", {})
+        state["deadline"] = ticket.deadline
+        # Time the validation stage from admission, not from arrival; the wait is its own stage
+        if ticket.holds_slot and "metrics_start" in state:
+            state["metrics_start"] = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(ticket)
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from app.config import settings
+from app.services.executor import DeadlineExceeded, run_inference
+from app.services.inference import batch_predict
+
+
+class PredictionBatcher:
+    """
+    Coalesce concurrent single-row predictions into one forest pass.
+
+    Requests arriving within ``window_ms`` of the first queued row, up to
+    ``max_size`` rows, are stacked into a matrix and scored with a single
+    ``SimpleRandomForest.predict`` call per model version. Each caller awaits
+    its own future. Rows whose deadline passed while they waited for the
+    window are dropped with DeadlineExceeded instead of being scored.
+    """
+
+    def __init__(self, window_ms: float, max_size: int):
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._queue = None
+        self._task = None
+        self._inflight = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the collector task on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """Stop collecting and wait for batches already dispatched"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, features, key=None, deadline=None) -> int:
+        """Queue one row for a model version and wait for its prediction index"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((features, key, deadline, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without blocking the next window, so batches can overlap
+            task = asyncio.create_task(self._flush(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _flush(self, batch):
+        groups = {}
+        now = time.monotonic()
+        for features, key, deadline, future in batch:
+            if deadline is not None and now >= deadline:
+                if not future.done():
+                    future.set_exception(DeadlineExceeded())
+                continue
+            groups.setdefault(key, []).append((features, future))
+        for key, items in groups.items():
+            rows = [features for features, _ in items]
+            try:
+                indices = await run_inference(batch_predict, rows, key)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), index in zip(items, indices):
+                if not future.done():
+                    future.set_result(index)
+
+
+batcher = PredictionBatcher(
+    window_ms=settings.batch_window_ms,
+    max_size=settings.batch_max_size,
+)
@@ -0,0 +1,208 @@
+import io
+import numpy as np
+import pandas as pd
+from starlette.responses import StreamingResponse
+
+N_FEATURES = 4
+# Same columns (and order) as notebooks/iris_train.csv; a trailing target column is ignored
+FEATURE_COLUMNS = ("sepal length (cm)", "sepal width (cm)", "petal length (cm)", "petal width (cm)")
+
+CSV_TYPES = ("text/csv", "application/csv")
+NPY_TYPES = ("application/x-npy", "application/octet-stream")
+
+_NPY_MAGIC = b"\x93NUMPY"
+
+
+class BulkFormatError(ValueError):
+    """The upload cannot be decoded, or a row breaks the feature rules"""
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that can keep reading the request body while it streams.
+
+    Under ASGI < 2.4 Starlette watches receive() for http.disconnect while
+    streaming, which swallows the body chunks /predict/bulk (and
+    /predict/stream) are still consuming: the upload looks finished after the
+    first chunks and the response is silently truncated. A disconnect
+    surfaces instead as ClientDisconnect from request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class _Decoder:
+    """Turns body chunks into row blocks of at most chunk_rows rows"""
+
+    def __init__(self, chunk_rows: int):
+        self.chunk_rows = max(1, chunk_rows)
+        self.ready = False
+        self.rows = 0
+        self._buffer = bytearray()
+
+    def _check(self, block: np.ndarray) -> np.ndarray:
+        """Same rules as PredictionInput: every value finite and non-negative"""
+        invalid = ~(np.isfinite(block) & (block >= 0)).all(axis=1)
+        if invalid.any():
+            row = self.rows + int(np.argmax(invalid)) + 1
+            raise BulkFormatError(f"Row {row}: all features must be finite numbers greater than or equal to zero")
+        self.rows += len(block)
+        return block
+
+    def feed(self, data: bytes) -> list:
+        raise NotImplementedError
+
+    def close(self) -> list:
+        raise NotImplementedError
+
+
+class NpyDecoder(_Decoder):
+    """Incremental reader for a C-ordered (n, 4) float32/float64 .npy stream"""
+
+    def __init__(self, chunk_rows: int):
+        super().__init__(chunk_rows)
+        self.dtype = None
+        self.expected_rows = None
+
+    def _read_header(self) -> bool:
+        if len(self._buffer) < 10:
+            return False
+        if self._buffer[:6] != _NPY_MAGIC:
+            raise BulkFormatError("The body is not a .npy file")
+        major = self._buffer[6]
+        if major == 1:
+            start, length = 10, int.from_bytes(self._buffer[8:10], "little")
+        elif major in (2, 3):
+            if len(self._buffer) < 12:
+                return False
+            start, length = 12, int.from_bytes(self._buffer[8:12], "little")
+        else:
+            raise BulkFormatError(f"Unsupported .npy version {major}")
+        if len(self._buffer) < start + length:
+            return False
+
+        f = io.BytesIO(bytes(self._buffer[:start + length]))
+        version = np.lib.format.read_magic(f)
+        try:
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        except ValueError as e:
+            raise BulkFormatError(f"Invalid .npy header: {e}")
+        if fortran_order:
+            raise BulkFormatError("Fortran-ordered arrays cannot be streamed by row; save np.ascontiguousarray(X)")
+        if dtype.kind != "f" or dtype.itemsize not in (4, 8):
+            raise BulkFormatError(f"Expected float32 or float64 data, got {dtype}")
+        if len(shape) != 2 or shape[1] != N_FEATURES:
+            raise BulkFormatError(f"Expected an array of shape (n, {N_FEATURES}), got {shape}")
+
+        self.dtype = dtype
+        self.expected_rows = shape[0]
+        del self._buffer[:start + length]
+        self.ready = True
+        return True
+
+    def _take(self, n_rows: int) -> np.ndarray:
+        n_bytes = n_rows * N_FEATURES * self.dtype.itemsize
+        block = np.frombuffer(bytes(self._buffer[:n_bytes]), dtype=self.dtype).reshape(n_rows, N_FEATURES)
+        del self._buffer[:n_bytes]
+        return self._check(block.astype(np.float64))
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        if not self.ready and not self._read_header():
+            return []
+        blocks = []
+        row_bytes = N_FEATURES * self.dtype.itemsize
+        while len(self._buffer) >= self.chunk_rows * row_bytes:
+            blocks.append(self._take(self.chunk_rows))
+        return blocks
+
+    def close(self) -> list:
+        if not self.ready and not self._read_header():
+            raise BulkFormatError("Truncated .npy header")
+        row_bytes = N_FEATURES * self.dtype.itemsize
+        if len(self._buffer) % row_bytes:
+            raise BulkFormatError("Truncated .npy data")
+        remaining = len(self._buffer) // row_bytes
+        if self.rows + remaining != self.expected_rows:
+            raise BulkFormatError(f"Expected {self.expected_rows} rows, got {self.rows + remaining}")
+        return [self._take(remaining)] if remaining else []
+
+
+class CsvDecoder(_Decoder):
+    """Incremental reader for CSV uploads with the iris_train.csv header"""
+
+    def _read_header(self) -> bool:
+        end = self._buffer.find(b"\n")
+        if end < 0:
+            return False
+        names = [name.strip() for name in self._buffer[:end].decode("utf-8-sig").strip().split(",")]
+        if tuple(names[:N_FEATURES]) != FEATURE_COLUMNS:
+            raise BulkFormatError(f"Expected header starting with: {','.join(FEATURE_COLUMNS)}")
+        del self._buffer[:end + 1]
+        self.ready = True
+        return True
+
+    def _parse(self, lines: bytes) -> np.ndarray:
+        # Empty fields and short rows become NaN, which _check rejects
+        try:
+            frame = pd.read_csv(
+                io.BytesIO(lines), header=None, usecols=range(N_FEATURES),
+                dtype=np.float64, skip_blank_lines=True
+            )
+        except (ValueError, pd.errors.ParserError) as e:
+            raise BulkFormatError(f"Invalid CSV rows after row {self.rows}: {e}")
+        return self._check(frame.to_numpy())
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        if not self.ready and not self._read_header():
+            return []
+        blocks = []
+        while self._buffer.count(b"\n") >= self.chunk_rows:
+            end = -1
+            for _ in range(self.chunk_rows):
+                end = self._buffer.find(b"\n", end + 1)
+            blocks.append(self._parse(bytes(self._buffer[:end + 1])))
+            del self._buffer[:end + 1]
+        return blocks
+
+    def close(self) -> list:
+        if not self.ready:
+            if not self._buffer.strip():
+                raise BulkFormatError("The CSV upload is empty")
+            # Header without a trailing newline: no rows to score
+            self._buffer += b"\n"
+            self._read_header()
+        if not self._buffer.strip():
+            return []
+        block = self._parse(bytes(self._buffer))
+        self._buffer.clear()
+        return [block] if len(block) else []
+
+
+def create_decoder(content_type: str, chunk_rows: int) -> _Decoder:
+    """Pick the decoder for a Content-Type; None if the type is not supported"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return CsvDecoder(chunk_rows)
+    if media_type in NPY_TYPES:
+        return NpyDecoder(chunk_rows)
+    return None
+
+
+def encode_labels(labels, names) -> bytes:
+    """One species name per line"""
+    return b"".join(names[int(i)] for i in labels)
+
+
+def encode_proba(proba: np.ndarray) -> bytes:
+    """One comma-separated row of class probabilities per line"""
+    buffer = io.StringIO()
+    np.savetxt(buffer, proba, fmt="%.6g", delimiter=",")
+    return buffer.getvalue().encode()
@@ -0,0 +1,519 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional
+from app.config import settings
+from app.services.log import logger
+
+
+class _LRUStore:
+    """Entries ordered by recency; the least recently used is evicted first"""
+
+    def __init__(self):
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+
+    def keys(self):
+        return list(self._data)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def victim(self):
+        key, _ = self._data.popitem(last=False)
+        return key
+
+    def clear(self):
+        self._data.clear()
+
+
+class _LFUStore:
+    """O(1) least-frequently-used store; ties are broken by recency"""
+
+    def __init__(self):
+        self._data = {}
+        self._freq = {}
+        self._buckets = defaultdict(OrderedDict)
+        self._min_freq = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def _touch(self, key):
+        freq = self._freq[key]
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._buckets[freq + 1][key] = None
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            self._touch(key)
+        return entry
+
+    def set(self, key, entry):
+        if key in self._data:
+            self._data[key] = entry
+            self._touch(key)
+            return
+        self._data[key] = entry
+        self._freq[key] = 1
+        self._buckets[1][key] = None
+        self._min_freq = 1
+
+    def keys(self):
+        return list(self._data)
+
+    def pop(self, key):
+        if key not in self._data:
+            return
+        freq = self._freq.pop(key)
+        del self._data[key]
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = min(self._buckets, default=0)
+
+    def victim(self):
+        key = next(iter(self._buckets[self._min_freq]))
+        self.pop(key)
+        return key
+
+    def clear(self):
+        self._data.clear()
+        self._freq.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+
+
+class _AsyncAccess:
+    """
+    Awaitable access used on the request path.
+
+    Backends that may block (disk, file locks) run in a worker thread so the
+    event loop keeps serving; in-memory lookups are cheaper than the thread
+    hop and run inline.
+    """
+
+    blocking = False
+
+    def get_many(self, rows, version=None) -> list:
+        return [self.get(features, version) for features in rows]
+
+    def put_many(self, rows, values, version=None):
+        for features, value in zip(rows, values):
+            self.put(features, value, version)
+
+    async def aget(self, features, version=None):
+        if self.blocking:
+            return await asyncio.to_thread(self.get, features, version)
+        return self.get(features, version)
+
+    async def aput(self, features, value, version=None):
+        if self.blocking:
+            await asyncio.to_thread(self.put, features, value, version)
+        else:
+            self.put(features, value, version)
+
+    async def aget_many(self, rows, version=None) -> list:
+        if self.blocking:
+            return await asyncio.to_thread(self.get_many, rows, version)
+        return self.get_many(rows, version)
+
+    async def aput_many(self, rows, values, version=None):
+        if self.blocking:
+            await asyncio.to_thread(self.put_many, rows, values, version)
+        else:
+            self.put_many(rows, values, version)
+
+    async def aclear(self):
+        if self.blocking:
+            await asyncio.to_thread(self.clear)
+        else:
+            self.clear()
+
+    async def astats(self) -> dict:
+        if self.blocking:
+            return await asyncio.to_thread(self.stats)
+        return self.stats()
+
+
+class PredictionCache(_AsyncAccess):
+    """
+    Bounded cache of prediction indices keyed by feature rows.
+
+    Keys can be rounded to ``precision`` decimals so near-identical rows
+    share an entry. Entries expire after ``ttl_seconds`` (0 disables it).
+    Entries are stored per model version, so several versions can be served
+    side by side; ``drop_version`` removes one when it is retired.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1000,
+        policy: str = "lru",
+        ttl_seconds: float = 0.0,
+        precision: Optional[int] = None
+    ):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self.version = None
+        self._store = _LRUStore() if policy == "lru" else _LFUStore()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def key(self, features) -> tuple:
+        """Cache key for a feature row, quantized if a precision is set"""
+        if self.precision is None:
+            return tuple(features)
+        return tuple(round(x, self.precision) for x in features)
+
+    def get(self, features, version=None):
+        """Return the cached index for a row, or None on a miss"""
+        if self.capacity <= 0:
+            return None
+        key = (version, self.key(features))
+        with self._lock:
+            if version is not None:
+                self.version = version
+            entry = self._store.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                self._store.pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def put(self, features, value, version=None):
+        """Store the index for a row, evicting according to the policy"""
+        if self.capacity <= 0:
+            return
+        key = (version, self.key(features))
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        with self._lock:
+            if version is not None:
+                self.version = version
+            if key not in self._store:
+                while len(self._store) >= self.capacity:
+                    self._store.victim()
+                    self.evictions += 1
+            self._store.set(key, (value, expires_at))
+
+    def drop_version(self, version):
+        """Drop the entries of one model version"""
+        with self._lock:
+            for key in self._store.keys():
+                if key[0] == version:
+                    self._store.pop(key)
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry, keeping counters"""
+        with self._lock:
+            self._store.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "size": len(self._store),
+            "ttl_seconds": self.ttl_seconds,
+            "precision": self.precision,
+            "model_version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SqlitePredictionCache(_AsyncAccess):
+    """
+    Prediction cache stored in a SQLite file on local disk.
+
+    Every uvicorn worker on the node opens the same file, so an entry
+    computed by one worker is a hit for all of them. Rows are keyed by model
+    version; ``drop_version`` purges one when it is retired.
+    Hit/miss counters are per process, size and evictions reflect the file.
+
+    Hits are read-only: the recency/frequency updates they imply are
+    buffered and written in one statement every ``TOUCH_BATCH`` hits, and the
+    capacity is enforced every ``trim_every`` inserts instead of counting rows
+    on each one, so the file may briefly hold a few entries more than
+    ``capacity``. A locked or broken database is a miss, never an error.
+    """
+
+    blocking = True
+    # Hits whose last_access/hits updates are written together
+    TOUCH_BATCH = 64
+    # Seconds to wait on a lock held by another worker before giving up
+    BUSY_TIMEOUT = 0.05
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 1000,
+        policy: str = "lru",
+        ttl_seconds: float = 0.0,
+        precision: Optional[int] = None
+    ):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown cache policy: {policy}")
+        self.path = path
+        self.capacity = capacity
+        self.policy = policy
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self.version = None
+        self._order = "last_access" if policy == "lru" else "hits, last_access"
+        self.trim_every = max(1, min(256, capacity // 10))
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._touches = {}
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _connection(self):
+        # Una conexión por proceso; tras un fork se abre una nueva
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " version TEXT NOT NULL, key TEXT NOT NULL, value INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL,"
+                " PRIMARY KEY (version, key))"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS predictions_{self.policy} ON predictions ({self._order})")
+            self._conn = conn
+            self._pid = os.getpid()
+            self._touches = {}
+            self._inserts = 0
+        return self._conn
+
+    def _flush_touches(self, conn):
+        """Write the buffered last_access/hits updates in one statement"""
+        if self._touches:
+            touches, self._touches = self._touches, {}
+            conn.executemany(
+                "UPDATE predictions SET last_access = ?, hits = hits + ? WHERE version = ? AND key = ?",
+                [(last, count, version, key) for (version, key), (last, count) in touches.items()]
+            )
+
+    def _trim(self, conn):
+        """Evict down to the capacity according to the policy"""
+        self._flush_touches(conn)
+        excess = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.capacity
+        if excess > 0:
+            self.evictions += conn.execute(
+                f"DELETE FROM predictions WHERE rowid IN"
+                f" (SELECT rowid FROM predictions ORDER BY {self._order} LIMIT ?)",
+                (excess,)
+            ).rowcount
+
+    def key(self, features) -> str:
+        """Cache key for a feature row, quantized if a precision is set"""
+        if self.precision is not None:
+            features = (round(x, self.precision) for x in features)
+        return ",".join(repr(float(x)) for x in features)
+
+    def get(self, features, version=None):
+        """Return the cached index for a row, or None on a miss"""
+        return self.get_many([features], version)[0]
+
+    def get_many(self, rows, version=None) -> list:
+        """Look up several rows under one lock; None marks each miss"""
+        if self.capacity <= 0:
+            return [None] * len(rows)
+        version = version or ""
+        now = time.time()
+        values = []
+        with self._lock:
+            if version:
+                self.version = version
+            try:
+                conn = self._connection()
+                for features in rows:
+                    key = self.key(features)
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM predictions WHERE version = ? AND key = ?", (version, key)
+                    ).fetchone()
+                    if row is not None and row[1] and row[1] < now:
+                        conn.execute("DELETE FROM predictions WHERE version = ? AND key = ?", (version, key))
+                        self.expirations += 1
+                        row = None
+                    if row is None:
+                        self.misses += 1
+                        values.append(None)
+                        continue
+                    _, count = self._touches.get((version, key), (now, 0))
+                    self._touches[(version, key)] = (now, count + 1)
+                    self.hits += 1
+                    values.append(row[0])
+                if len(self._touches) >= self.TOUCH_BATCH:
+                    self._flush_touches(conn)
+            except sqlite3.Error:
+                # Locked by another worker or unreadable: answer from the model instead
+                self.errors += 1
+                self.misses += len(rows) - len(values)
+                values.extend([None] * (len(rows) - len(values)))
+        return values
+
+    def put(self, features, value, version=None):
+        """Store the index for a row, evicting according to the policy"""
+        self.put_many([features], [value], version)
+
+    def put_many(self, rows, values, version=None):
+        """Store several rows in one transaction"""
+        if self.capacity <= 0 or not rows:
+            return
+        version = version or ""
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        with self._lock:
+            if version:
+                self.version = version
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO predictions (version, key, value, expires_at, last_access, hits)"
+                        " VALUES (?, ?, ?, ?, ?, 0)",
+                        [(version, self.key(features), int(value), expires_at, now)
+                         for features, value in zip(rows, values)]
+                    )
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+                self._inserts += len(rows)
+                if self._inserts >= self.trim_every:
+                    self._inserts = 0
+                    self._trim(conn)
+            except sqlite3.Error:
+                # Not storing a prediction only costs a future miss
+                self.errors += 1
+
+    def drop_version(self, version):
+        """Drop the entries of one model version, for every worker"""
+        with self._lock:
+            self._touches = {key: touch for key, touch in self._touches.items() if key[0] != version}
+            try:
+                self._connection().execute("DELETE FROM predictions WHERE version = ?", (version,))
+            except sqlite3.Error as exc:
+                # The version key keeps its rows unreachable; trimming evicts them later
+                self.errors += 1
+                logger.warning("Could not drop cached predictions", extra={"version": version, "reason": str(exc)})
+                return
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry for every worker, keeping counters"""
+        with self._lock:
+            self._touches = {}
+            try:
+                self._connection().execute("DELETE FROM predictions")
+            except sqlite3.Error as exc:
+                self.errors += 1
+                logger.warning("Could not clear the prediction cache", extra={"reason": str(exc)})
+                return
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            try:
+                size = self._connection().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            except sqlite3.Error:
+                self.errors += 1
+                size = 0
+        return {
+            "backend": "sqlite",
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "size": size,
+            "ttl_seconds": self.ttl_seconds,
+            "precision": self.precision,
+            "model_version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_prediction_cache():
+    """Build the prediction cache backend selected in Settings"""
+    options = dict(
+        capacity=settings.cache_capacity,
+        policy=settings.cache_policy,
+        ttl_seconds=settings.cache_ttl_seconds,
+        precision=settings.cache_precision,
+    )
+    if settings.cache_backend == "sqlite":
+        return SqlitePredictionCache(path=settings.cache_path, **options)
+    return PredictionCache(**options)
+
+
+prediction_cache = create_prediction_cache()
@@ -0,0 +1,115 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from app.config import settings
+
+_executor = None
+# Processes sharing this machine's CPUs; app.server sets it before forking its workers
+_sibling_processes = 1
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before its inference started"""
+
+
+def check_deadline(deadline):
+    """Raise DeadlineExceeded if a monotonic deadline has passed; None means no deadline"""
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded()
+
+
+def _run_before(deadline, fn, *args):
+    # Checked again when a pool worker picks the call up: it may have waited in the queue
+    check_deadline(deadline)
+    return fn(*args)
+
+
+def _preload_model():
+    """Process pool initializer: unpickle and compile the model once per worker"""
+    from app.services.inference import load_model
+    load_model()
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually use.
+
+    os.cpu_count() reports the host's CPUs even inside a container; the
+    affinity mask and the cgroup CPU quota (v2 cpu.max, v1 cfs quota) are
+    what the scheduler enforces.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def set_sibling_processes(n: int):
+    """Tell the pool how many server processes share the CPUs, so they do not oversubscribe them"""
+    global _sibling_processes
+    _sibling_processes = max(1, n)
+
+
+def executor_workers() -> int:
+    """Configured pool size, resolving 0 to this process's share of the available CPUs"""
+    return settings.inference_workers or max(1, available_cpus() // _sibling_processes)
+
+
+def get_executor():
+    """Create the inference pool lazily so forked servers do not inherit its threads"""
+    global _executor
+    if _executor is None and settings.inference_executor != "inline":
+        workers = executor_workers()
+        if settings.inference_executor == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers, initializer=_preload_model)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+    return _executor
+
+
+async def run_inference(fn, *args, deadline=None):
+    """
+    Run a CPU-bound model call off the event loop.
+
+    With a ``deadline`` (time.monotonic() seconds) the call is dropped with
+    DeadlineExceeded instead of running once nobody is waiting for it.
+    """
+    check_deadline(deadline)
+    executor = get_executor()
+    if executor is None:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    if deadline is None:
+        return await loop.run_in_executor(executor, partial(fn, *args))
+    return await loop.run_in_executor(executor, partial(_run_before, deadline, fn, *args))
+
+
+def shutdown_executor():
+    """Release pool workers on application shutdown"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
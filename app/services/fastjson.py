@@ -0,0 +1,12 @@
+import json
+
+# orjson when installed; otherwise the standard library behind the same interface (dumps returns bytes)
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:
+    loads = json.loads
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
@@ -0,0 +1,231 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+import joblib
+import numpy as np
+from functools import lru_cache
+from typing import NamedTuple
+from model.artifact import load_forest, read_header
+from model.rf_custom import SimpleRandomForest
+from app.config import settings
+from app.services.log import logger
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "model")
+PATH_ARTIFACT = os.path.join(MODEL_DIR, "model.srf")
+PATH_MODEL = os.path.join(MODEL_DIR, "model.pkl")
+
+# Set by load_model, reported by /metrics
+model_load_seconds = None
+
+# Models loaded in this process, keyed by (path, version), and their descriptions
+_models = {}
+_details = {}
+_models_lock = threading.Lock()
+
+
+class ModelKey(NamedTuple):
+    """Identifies one model artifact; picklable so process workers can load it too"""
+    path: str
+    version: str
+
+
+def model_path():
+    """
+    Prefer the memory-mappable artifact; fall back to the legacy pickle.
+
+    The artifact records the hash of the pickle it was exported from. If the
+    pickle has changed since (the model was retrained) or the artifact does
+    not say where it came from, the pickle wins, so a stale artifact never
+    hides a new model. Run scripts/export_model.py to rebuild it.
+    """
+    if not os.path.exists(PATH_ARTIFACT):
+        return PATH_MODEL
+    if not os.path.exists(PATH_MODEL):
+        return PATH_ARTIFACT
+    try:
+        source = read_header(PATH_ARTIFACT).get("source_sha256")
+    except (OSError, ValueError):
+        source = None
+    if source != file_sha256(PATH_MODEL):
+        logger.warning(
+            "model.srf was not exported from the current model.pkl; using the pickle",
+            extra={"artifact": PATH_ARTIFACT, "pickle": PATH_MODEL}
+        )
+        return PATH_MODEL
+    return PATH_ARTIFACT
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def file_version(path):
+    """Short content hash of a model artifact, used to key caches"""
+    return file_sha256(path)[:12]
+
+
+@lru_cache()
+def default_key():
+    """Key of the artifact shipped with the service"""
+    path = os.path.abspath(model_path())
+    return ModelKey(path, file_version(path))
+
+
+def model_version():
+    """Version of the artifact shipped with the service"""
+    return default_key().version
+
+
+def _load_pickle(path):
+    # El pickle se generó desde un notebook, donde la clase vivía en __main__
+    sys.modules['__main__'].SimpleRandomForest = SimpleRandomForest
+    bundle = joblib.load(path)
+    # Inferencia sobre arreglos planos, sin una llamada a sklearn por árbol
+    metrics = {
+        k: v.tolist() if isinstance(v, (np.ndarray, np.generic)) else v
+        for k, v in bundle.items() if k != 'est'
+    }
+    return bundle['est'].compile(), metrics
+
+
+def _memory_bytes(model):
+    """Bytes held by the compiled arrays, the region table and any sklearn trees kept alongside"""
+    engine = model.engine_
+    total = sum(
+        getattr(engine, name).nbytes
+        for name in ("feature", "threshold", "left", "right", "missing_left", "value", "leaf_class", "roots")
+    )
+    total += sum(np.asarray(f).nbytes for f in model.feat_idx_)
+    if getattr(model, "region_index_", None) is not None:
+        total += model.region_index_.nbytes
+    for tree in model.trees_:
+        state = tree.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return int(total)
+
+
+def _describe(model, key, metrics, seconds):
+    # Everything /info reports, computed once per loaded version
+    return {
+        "artifact": os.path.basename(key.path),
+        "version": key.version,
+        "sha256": file_sha256(key.path),
+        "params": {
+            "n_estimators": model.n_estimators,
+            "max_features": model.max_features,
+            "max_depth": model.max_depth,
+            "random_state": model.random_state,
+        },
+        "classes": [c.item() if hasattr(c, "item") else c for c in model.classes_],
+        "n_trees": model.engine_.n_trees,
+        "node_count": model.engine_.node_count,
+        "depth": model.engine_.depth,
+        "memory_bytes": _memory_bytes(model),
+        "region_index_cells": model.region_index_.n_cells if getattr(model, "region_index_", None) else None,
+        "memory_mapped": isinstance(getattr(model.engine_.threshold, "base", None), np.memmap),
+        "load_seconds": seconds,
+        "oob_score": getattr(model, "oob_score_", None),
+        "metrics": metrics,
+    }
+
+
+def _build_region_index(model, key):
+    """Precompute the decision-region table; oversized grids keep tree traversal"""
+    try:
+        model.build_region_index(max_cells=settings.region_index_max_cells)
+    except ValueError as exc:
+        logger.warning(
+            "Índice de regiones omitido",
+            extra={"version": key.version, "reason": str(exc)}
+        )
+
+
+def load_model(key=None):
+    """Load a model version once per process and keep it"""
+    global model_load_seconds
+    key = key or default_key()
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+        start = time.perf_counter()
+        if key.path.endswith(".srf"):
+            model, header = load_forest(key.path, mmap=True)
+            metrics = header["metrics"]
+        else:
+            model, metrics = _load_pickle(key.path)
+        if settings.region_index_enabled and getattr(model, "region_index_", None) is None:
+            _build_region_index(model, key)
+        model_load_seconds = time.perf_counter() - start
+        _details[key] = _describe(model, key, metrics, model_load_seconds)
+        _models[key] = model
+    logger.info(
+        "Modelo cargado",
+        extra={
+            "path": os.path.basename(key.path),
+            "version": key.version,
+            "n_trees": model.engine_.n_trees,
+            "seconds": model_load_seconds
+        }
+    )
+    return model
+
+
+def unload_model(key):
+    """Forget a model version in this process"""
+    with _models_lock:
+        _models.pop(key, None)
+        _details.pop(key, None)
+
+
+def model_details(key=None):
+    """Description of a loaded model version, computed when it was loaded"""
+    key = key or default_key()
+    load_model(key)
+    return _details[key]
+
+
+def predict_one(features_tuple, key=None):
+    """Predict a single row; caching is handled by app.services.cache"""
+    model = load_model(key)
+    features = [list(features_tuple)]
+    prediction_index = model.predict(features)[0]
+    return int(prediction_index)
+
+
+def predict_one_proba(features_tuple, key=None):
+    """Predict a single row returning (class index, per-class probabilities)"""
+    model = load_model(key)
+    labels, proba = model.predict_with_proba([list(features_tuple)])
+    return int(labels[0]), proba[0].tolist()
+
+
+def _predict_matrix(model, X):
+    """Labels for many rows; early-exit voting only where it beats the full pass"""
+    if (
+        settings.adaptive_voting_enabled
+        and getattr(model, "region_index_", None) is None
+        and len(X) >= settings.adaptive_voting_min_rows
+    ):
+        labels, _ = model.predict_adaptive(X)
+        return labels
+    return model.predict(X)
+
+
+def batch_predict(rows, key=None):
+    """Run every row through the forest as a single matrix"""
+    model = load_model(key)
+    X = np.asarray(rows, dtype=float)
+    return [int(i) for i in _predict_matrix(model, X)]
+
+
+def bulk_predict(X, proba=False, key=None):
+    """Score one decoded block: class indices, or the probability matrix"""
+    model = load_model(key)
+    return model.predict_proba(X) if proba else _predict_matrix(model, X)
@@ -0,0 +1,248 @@
+import bisect
+import time
+from typing import Dict, Optional, Tuple
+from app.services import inference
+from app.services.cache import prediction_cache
+
+# Latency buckets in seconds, tuned for a sub-millisecond model behind HTTP
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self):
+        for values, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, values)} {value}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str):
+        self._values[label_values] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            # Per-bucket counts (not cumulative) + sum + count
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+        for values, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, n in zip(bounds, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(self.labels, values, bound)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, values)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labels, values)} {count}"
+
+
+class Registry:
+    """Holds metrics and renders them as text"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Callable refreshing gauges right before each scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route, method and status",
+    labels=("method", "route", "status")
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served"
+))
+STAGE_LATENCY = registry.register(Histogram(
+    "predict_stage_duration_seconds",
+    "Time spent per prediction stage (validation, admission, cache_lookup, inference, serialization)",
+    labels=("route", "stage")
+))
+CACHE_EVENTS = registry.register(Gauge(
+    "prediction_cache_events",
+    "Prediction cache counters for this worker (hits, misses, evictions, expirations, invalidations, errors)",
+    labels=("event",)
+))
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "prediction_cache_hit_ratio",
+    "Prediction cache hits / lookups for this worker"
+))
+CACHE_SIZE = registry.register(Gauge(
+    "prediction_cache_size",
+    "Entries currently stored in the prediction cache"
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "admission_rejected_total",
+    "Prediction requests turned away before inference (rate_limited, saturated, expired)",
+    labels=("reason",)
+))
+ADMISSION_QUEUED = registry.register(Gauge(
+    "admission_queued_requests",
+    "Prediction requests waiting for an in-flight slot"
+))
+PROCESS_MEMORY = registry.register(Gauge(
+    "process_memory_bytes",
+    "Memory of the worker that answered the scrape: rss, pss (shared pages split between processes) and shared",
+    labels=("kind",)
+))
+MODEL_LOAD_SECONDS = registry.register(Gauge(
+    "model_load_seconds",
+    "Time spent loading the model artifact"
+))
+
+
+def _collect_cache_and_model():
+    stats = prediction_cache.stats()
+    for event in ("hits", "misses", "evictions", "expirations", "invalidations", "errors"):
+        CACHE_EVENTS.set(stats[event], event)
+    CACHE_HIT_RATIO.set(stats["hit_ratio"])
+    CACHE_SIZE.set(stats["size"])
+    if inference.model_load_seconds is not None:
+        MODEL_LOAD_SECONDS.set(inference.model_load_seconds)
+
+
+def process_memory(pid="self") -> Dict[str, int]:
+    """Resident, proportional and shared memory of a process in bytes (Linux /proc; empty elsewhere)"""
+    fields = {"Rss:": "rss", "Pss:": "pss", "Shared_Clean:": "shared", "Shared_Dirty:": "shared"}
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    kind = fields[parts[0]]
+                    memory[kind] = memory.get(kind, 0) + int(parts[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+def _collect_process_memory():
+    for kind, value in process_memory().items():
+        PROCESS_MEMORY.set(value, kind)
+
+
+registry.add_collector(_collect_cache_and_model)
+registry.add_collector(_collect_process_memory)
+
+
+def observe_stage(route: str, stage: str, seconds: float):
+    """Record the duration of one prediction stage"""
+    STAGE_LATENCY.observe(seconds, route, stage)
+
+
+def mark_handler_start(request) -> Optional[float]:
+    """Record validation time (request start until the handler runs) and return now"""
+    now = time.perf_counter()
+    started = getattr(request.state, "metrics_start", None)
+    if started is not None:
+        observe_stage(request.url.path, "validation", now - started)
+    return now
+
+
+def mark_handler_end(request):
+    """Remember when the handler returned so the middleware can time serialization"""
+    request.state.metrics_handler_end = time.perf_counter()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = scope.setdefault("state", {})
+        state["metrics_start"] = start
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                handler_end = state.get("metrics_handler_end")
+                if handler_end is not None:
+                    observe_stage(scope["path"], "serialization", time.perf_counter() - handler_end)
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], route_path, str(status["code"]))
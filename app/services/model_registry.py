@@ -0,0 +1,159 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from app.config import settings
+from app.services.cache import prediction_cache
+from app.services.inference import ModelKey, file_version, model_path, unload_model
+from app.services.log import logger
+from app.services.warmup import PROJECT_DIR, warm_model
+
+
+class ModelEntry:
+    """One registered model version and its in-flight request count"""
+
+    def __init__(self, key: ModelKey):
+        self.key = key
+        self.loaded_at = time.time()
+        self.warmup_seconds = None
+        self.cached_rows = 0
+        self.warmed = False
+        self.in_flight = 0
+        self.retiring = False
+        self._drained = asyncio.Event()
+
+    @property
+    def version(self) -> str:
+        return self.key.version
+
+
+class ModelRegistry:
+    """
+    Model versions loaded in this worker, keyed by content hash.
+
+    Requests acquire a version (the active one unless they ask for another),
+    so retiring a version can wait for its in-flight requests to finish.
+    Switching the active version is a single assignment, done only after the
+    new version has been loaded and warmed, so the live path never sees a
+    cold model or a cold cache.
+
+    The registry is per process. Under the pre-fork server ``workers`` is
+    the number of sibling processes; changes made through one of them would
+    not reach the others, so they are refused there (see ``mutable``).
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, ModelEntry] = {}
+        self.active_version: Optional[str] = None
+        self._lock = asyncio.Lock()
+        # Set by app.server before forking
+        self.workers = 1
+
+    @property
+    def mutable(self) -> bool:
+        """Whether loading, activating or retiring versions here affects every worker"""
+        return self.workers <= 1
+
+    @staticmethod
+    def startup_path() -> str:
+        """Artifact activated at startup"""
+        path = settings.model_path or model_path()
+        if not os.path.isabs(path):
+            path = os.path.join(PROJECT_DIR, path)
+        return os.path.abspath(path)
+
+    def entries(self):
+        return list(self._entries.values())
+
+    def get(self, version: Optional[str] = None) -> ModelEntry:
+        """Entry for a version, or the active one; KeyError if it is not being served"""
+        if version is None:
+            if self.active_version is None:
+                # Warm-up disabled or still running: serve the startup artifact, loaded lazily
+                path = self.startup_path()
+                key = ModelKey(path, file_version(path))
+                self._entries.setdefault(key.version, ModelEntry(key))
+                self.active_version = key.version
+            version = self.active_version
+        entry = self._entries.get(version)
+        if entry is None or entry.retiring:
+            raise KeyError(version)
+        return entry
+
+    def acquire(self, version: Optional[str] = None) -> ModelEntry:
+        """Pin a version for the duration of a request"""
+        entry = self.get(version)
+        entry.in_flight += 1
+        return entry
+
+    def release(self, entry: ModelEntry):
+        entry.in_flight -= 1
+        if entry.retiring and entry.in_flight == 0:
+            entry._drained.set()
+
+    @contextmanager
+    def use(self, version: Optional[str] = None):
+        entry = self.acquire(version)
+        try:
+            yield entry
+        finally:
+            self.release(entry)
+
+    async def load(self, path: str, activate: bool = False, warm: bool = True) -> ModelEntry:
+        """Register an artifact, warm it in the inference pool and optionally activate it"""
+        async with self._lock:
+            path = os.path.abspath(path)
+            version = await asyncio.to_thread(file_version, path)
+            entry = self._entries.get(version)
+            if entry is None or entry.retiring:
+                entry = ModelEntry(ModelKey(path, version))
+            if warm and not entry.warmed:
+                start = time.perf_counter()
+                entry.cached_rows = await warm_model(entry.key)
+                entry.warmup_seconds = time.perf_counter() - start
+                entry.warmed = True
+            self._entries[version] = entry
+            if activate or self.active_version is None:
+                self._activate(version)
+            logger.info(
+                "Model version registered",
+                extra={"version": version, "path": path, "active": self.active_version == version}
+            )
+            return entry
+
+    def _activate(self, version: str):
+        entry = self.get(version)
+        previous, self.active_version = self.active_version, entry.version
+        if previous != entry.version:
+            logger.info("Active model switched", extra={"version": entry.version, "previous": previous})
+
+    async def activate(self, version: str) -> ModelEntry:
+        """Make an already registered version the default for new requests"""
+        async with self._lock:
+            self._activate(version)
+            return self._entries[version]
+
+    async def retire(self, version: str) -> ModelEntry:
+        """Stop serving a version, wait for its in-flight requests and drop its cache"""
+        async with self._lock:
+            entry = self.get(version)
+            if version == self.active_version:
+                raise ValueError("The active version cannot be retired")
+            entry.retiring = True
+            if entry.in_flight:
+                try:
+                    await asyncio.wait_for(entry._drained.wait(), settings.model_drain_timeout_seconds)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        "Drain timed out, retiring anyway",
+                        extra={"version": version, "in_flight": entry.in_flight}
+                    )
+            del self._entries[version]
+            await asyncio.to_thread(prediction_cache.drop_version, version)
+            unload_model(entry.key)
+            logger.info("Model version retired", extra={"version": version})
+            return entry
+
+
+model_registry = ModelRegistry()
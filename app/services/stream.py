@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, List, NamedTuple, Optional, Tuple
+from pydantic import ValidationError
+from app.models.schemas import PredictionInput
+from app.services.fastjson import loads
+
+
+class StreamMessage(NamedTuple):
+    """One decoded row of a prediction stream; exactly one of features/error is set"""
+    id: Any
+    features: Optional[Tuple[float, ...]]
+    error: Optional[str]
+
+
+def parse_message(raw) -> StreamMessage:
+    """Decode {"id": ..., "features": [...]} with the same rules as /predict"""
+    try:
+        payload = loads(raw)
+    except ValueError:
+        return StreamMessage(None, None, "JSON inválido")
+    if not isinstance(payload, dict):
+        return StreamMessage(None, None, "Se esperaba un objeto JSON")
+    message_id = payload.get("id")
+    try:
+        features = PredictionInput.model_validate(payload).features
+    except ValidationError as e:
+        error = e.errors(include_url=False)[0]
+        field = ".".join(str(part) for part in error["loc"])
+        return StreamMessage(message_id, None, f"{field}: {error['msg']}" if field else error["msg"])
+    return StreamMessage(message_id, tuple(features), None)
+
+
+class LineSplitter:
+    """Turns NDJSON body chunks into complete lines, skipping blank ones"""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        lines = (self._buffer + data).split(b"\n")
+        self._buffer = lines.pop()
+        return [line for line in lines if line.strip()]
+
+    def close(self) -> List[bytes]:
+        tail, self._buffer = self._buffer, b""
+        return [tail] if tail.strip() else []
+
+
+async def next_batch(queue: asyncio.Queue, max_size: int) -> Tuple[list, bool]:
+    """
+    Wait for one queued message, then take whatever else is already queued.
+
+    Batches grow on their own while inference is busy and stay at one row
+    when traffic is light, so no latency is added waiting for a window.
+    Returns (messages, closed); ``None`` in the queue marks the end of the stream.
+    """
+    batch = [await queue.get()]
+    while len(batch) < max_size and not queue.empty() and batch[-1] is not None:
+        batch.append(queue.get_nowait())
+    if batch[-1] is None:
+        return batch[:-1], True
+    return batch, False
@@ -0,0 +1,100 @@
+import asyncio
+import csv
+import math
+import os
+import time
+from app.config import settings
+from app.services.cache import prediction_cache
+from app.services.executor import executor_workers, run_inference
+from app.services.inference import batch_predict, load_model, predict_one
+from app.services.log import logger
+
+PROJECT_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+class Readiness:
+    """Tracks whether this worker has finished warming up"""
+
+    def __init__(self):
+        self.ready = False
+        self.error = None
+        self.warmup_seconds = None
+        self.cached_rows = 0
+
+
+readiness = Readiness()
+
+
+def _warmup_rows():
+    """Feature rows used to pre-populate the prediction cache"""
+    path = settings.warmup_data_path
+    if not path:
+        return []
+    if not os.path.isabs(path):
+        path = os.path.join(PROJECT_DIR, path)
+    rows = []
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for record in reader:
+            try:
+                row = [float(x) for x in record[:4]]
+            except ValueError:
+                continue
+            if len(row) == 4 and all(math.isfinite(x) and x >= 0 for x in row):
+                rows.append(row)
+            if len(rows) >= settings.warmup_max_rows:
+                break
+    return rows
+
+
+def _warm_process(features, key) -> int:
+    """One prediction inside a pool process; returns its pid so the caller can count them"""
+    predict_one(features, key)
+    return os.getpid()
+
+
+async def warm_model(key) -> int:
+    """Load one model version, warm the inference pool and pre-populate its cache"""
+    # Loaded in a thread so the event loop keeps answering meanwhile
+    await asyncio.to_thread(load_model, key)
+    dummy = (0.0, 0.0, 0.0, 0.0)
+    if settings.inference_executor == "process":
+        # As many calls as pool processes, but the pool may hand several to the same one;
+        # a process that got none loads the version on its first request instead
+        workers = executor_workers()
+        pids = await asyncio.gather(*[run_inference(_warm_process, dummy, key) for _ in range(workers)])
+        logger.info(
+            "Inference pool warmed",
+            extra={"version": key.version, "warmed_processes": len(set(pids)), "pool_processes": workers}
+        )
+    else:
+        await run_inference(predict_one, dummy, key)
+
+    rows = await asyncio.to_thread(_warmup_rows)
+    if rows:
+        indices = await run_inference(batch_predict, rows, key)
+        await prediction_cache.aput_many([tuple(row) for row in rows], indices, key.version)
+    return len(rows)
+
+
+async def warm_up():
+    """Load and warm the startup model through the registry, then mark ready"""
+    # Deferred import: the registry itself imports warm_model from this module
+    from app.services.model_registry import model_registry
+
+    start = time.perf_counter()
+    try:
+        entry = await model_registry.load(model_registry.startup_path(), activate=True)
+        readiness.cached_rows = entry.cached_rows
+        readiness.ready = True
+    except Exception as e:
+        readiness.error = str(e)
+        logger.exception("Error during warm-up")
+    finally:
+        readiness.warmup_seconds = time.perf_counter() - start
+    if readiness.ready:
+        logger.info(
+            "Warm-up complete",
+            extra={"seconds": readiness.warmup_seconds, "cached_rows": readiness.cached_rows}
+        )
@@ -0,0 +1,164 @@
+"""
+Formato de artefacto sin pickle para SimpleRandomForest.
+
+Estructura del archivo (little-endian):
+
+    b"SRFA" | versión uint32 | largo del encabezado uint64 | encabezado JSON
+    arreglos crudos, cada uno alineado a 64 bytes
+
+El encabezado guarda hiperparámetros, clases, métricas, el SHA-256 del
+pickle del que se exportó (si se conoce) y, por cada arreglo, su dtype,
+forma y desplazamiento. Al cargar con ``mmap=True`` los arreglos
+son vistas de solo lectura sobre un ``np.memmap``, así que varios procesos
+comparten la misma copia en el page cache y no hay deserialización.
+"""
+import json
+import struct
+import numpy as np
+from model.forest_engine import CompiledForest
+from model.rf_custom import SimpleRandomForest
+
+MAGIC = b"SRFA"
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct("<4sIQ")
+
+# Arreglos del motor compilado y el dtype con el que se guardan
+_ENGINE_ARRAYS = {
+    "feature": "<i4",
+    "threshold": "<f8",
+    "left": "<i4",
+    "right": "<i4",
+    "missing_left": "|b1",
+    "value": "<f8",
+    "leaf_class": "<i4",
+    "roots": "<i4",
+}
+
+# Arreglos opcionales del índice de regiones (None: conserva el dtype de la tabla)
+_REGION_ARRAYS = {
+    "region_thresholds": "<f8",
+    "region_ptr": "<i8",
+    "region_table": None,
+}
+
+
+def _to_builtin(value):
+    # Convierte métricas de NumPy a tipos serializables en JSON
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _padding(n):
+    return (-n) % ALIGN
+
+
+def _data_start(header_length):
+    start = _PREFIX.size + header_length
+    return start + _padding(start)
+
+
+def save_forest(forest, path, metrics=None, source_sha256=None):
+    # Escribe el bosque compilado y feat_idx_ en formato SRFA; source_sha256 identifica el pickle de origen
+    if not forest.compiled:
+        forest.compile()
+    engine = forest.engine_
+
+    arrays = {name: np.ascontiguousarray(getattr(engine, name), dtype=dtype) for name, dtype in _ENGINE_ARRAYS.items()}
+    feats = [np.asarray(f) for f in forest.feat_idx_]
+    arrays["feat_idx"] = np.ascontiguousarray(np.concatenate(feats), dtype="<i4")
+    arrays["feat_ptr"] = np.ascontiguousarray(np.cumsum([0] + [f.size for f in feats]), dtype="<i4")
+    # Índice de regiones opcional; se guarda tal cual para que también se mapee en memoria
+    index = getattr(forest, "region_index_", None)
+    if index is not None:
+        for name, arr in index.to_arrays().items():
+            arrays[name] = np.ascontiguousarray(arr, dtype=_REGION_ARRAYS[name] or arr.dtype.newbyteorder("<"))
+
+    header = {
+        "format": FORMAT_VERSION,
+        "params": {
+            "n_estimators": forest.n_estimators,
+            "max_features": forest.max_features,
+            "max_depth": forest.max_depth,
+            "oob_score": forest.oob_score,
+            "random_state": forest.random_state,
+        },
+        "oob_score_": forest.oob_score_,
+        "classes": _to_builtin(forest.classes_),
+        "depth": engine.depth,
+        "metrics": {k: _to_builtin(v) for k, v in (metrics or {}).items()},
+        "source_sha256": source_sha256,
+        "arrays": {},
+    }
+
+    # Desplazamientos relativos al inicio de la zona de datos, que empieza alineada tras el encabezado
+    offset = 0
+    for name, arr in arrays.items():
+        header["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes + _padding(arr.nbytes)
+
+    blob = json.dumps(header).encode("utf-8")
+    data_start = _data_start(len(blob))
+
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(blob)))
+        f.write(blob)
+        f.write(b"\0" * (data_start - _PREFIX.size - len(blob)))
+        for arr in arrays.values():
+            f.write(arr.tobytes())
+            f.write(b"\0" * _padding(arr.nbytes))
+    return path
+
+
+def _read_prefix(f, path):
+    magic, version, length = _PREFIX.unpack(f.read(_PREFIX.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} no es un artefacto SRFA.")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Versión de artefacto no soportada: {version}")
+    return length
+
+
+def read_header(path):
+    # Lee solo el encabezado JSON del artefacto
+    with open(path, "rb") as f:
+        length = _read_prefix(f, path)
+        header = json.loads(f.read(length))
+    header["data_start"] = _data_start(length)
+    return header
+
+
+def load_forest(path, mmap=True):
+    # Reconstruye un SimpleRandomForest listo para inferencia; regresa (bosque, encabezado)
+    header = read_header(path)
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+    arrays = {
+        name: np.ndarray(
+            tuple(meta["shape"]),
+            dtype=np.dtype(meta["dtype"]),
+            buffer=buffer,
+            offset=header["data_start"] + meta["offset"],
+        )
+        for name, meta in header["arrays"].items()
+    }
+
+    forest = SimpleRandomForest(**header["params"])
+    forest.classes_ = np.asarray(header["classes"])
+    forest.oob_score_ = header["oob_score_"]
+    ptr = arrays["feat_ptr"]
+    forest.feat_idx_ = [arrays["feat_idx"][ptr[i]:ptr[i + 1]] for i in range(ptr.size - 1)]
+    forest.engine_ = CompiledForest(
+        depth=header["depth"],
+        classes=forest.classes_,
+        **{name: arrays[name] for name in _ENGINE_ARRAYS},
+    )
+    if all(name in arrays for name in _REGION_ARRAYS):
+        from model.region_index import RegionIndex
+        forest.region_index_ = RegionIndex.from_arrays(**{name: arrays[name] for name in _REGION_ARRAYS})
+    return forest, header
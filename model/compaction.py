@@ -0,0 +1,289 @@
+"""
+Compactación de un SimpleRandomForest ya compilado.
+
+Trabaja directo sobre los arreglos de ``CompiledForest``, así que sirve igual
+para modelos cargados del pickle o de un artefacto SRFA:
+
+1. Fusiona hojas hermanas con la misma distribución de clases (normalizada).
+   El nodo padre pasa a ser hoja con esa misma distribución, así que ni los
+   votos ni ``predict_proba`` cambian. Con ``same_class=True`` también fusiona
+   hermanas que solo comparten la clase: el padre conserva su propia
+   distribución de entrenamiento, que mueve las probabilidades y puede
+   cambiar desempates, a cambio de más nodos eliminados.
+2. Elimina árboles duplicados (misma estructura, umbrales y hojas).
+3. Opcionalmente elige con una búsqueda voraz el subconjunto más pequeño de
+   árboles cuya exactitud queda dentro de una tolerancia.
+
+Los pasos 1 (sin ``same_class``) y 2 no cambian predicciones. La fusión por
+clase y el paso 3 sí pueden hacerlo; ``compact_forest`` reporta la exactitud,
+la concordancia de etiquetas y la diferencia máxima de probabilidades
+respecto al modelo original.
+"""
+import time
+import numpy as np
+from model.artifact import _ENGINE_ARRAYS
+from model.forest_engine import CompiledForest
+from model.rf_custom import SimpleRandomForest
+
+# Valores canónicos para los campos que una hoja no usa
+_LEAF_FEATURE = 0
+_LEAF_THRESHOLD = -2.0
+
+
+def _tree_bounds(engine):
+    # Rango [inicio, fin) de cada árbol en los arreglos planos
+    ends = np.append(engine.roots[1:], engine.node_count)
+    return list(zip(engine.roots.tolist(), ends.tolist()))
+
+
+def merge_leaves(engine, same_class=False):
+    # Convierte en hoja todo nodo cuyas dos hijas son hojas con la misma distribución
+    # (o solo la misma clase, con same_class), hasta que no haya cambios
+    left = np.array(engine.left, dtype=np.intp)
+    right = np.array(engine.right, dtype=np.intp)
+    feature = np.array(engine.feature, dtype=np.intp)
+    threshold = np.array(engine.threshold, dtype=np.float64)
+    missing_left = np.array(engine.missing_left, dtype=bool)
+    leaf_class = np.array(engine.leaf_class, dtype=np.intp)
+    value = np.array(engine.value, dtype=np.float64)
+    ids = np.arange(left.size)
+
+    while True:
+        leaf = left == ids
+        mergeable = ~leaf & leaf[left] & leaf[right] & (leaf_class[left] == leaf_class[right])
+        if not same_class:
+            mergeable &= np.all(value[left] == value[right], axis=1)
+        if not mergeable.any():
+            break
+        nodes = ids[mergeable]
+        leaf_class[nodes] = leaf_class[left[nodes]]
+        if not same_class:
+            # La distribución de la hija, no la del padre: idéntica bit a bit a la que se usaba
+            value[nodes] = value[left[nodes]]
+        # Con same_class el padre se queda con su distribución, la de las muestras que llegaban a él
+        left[nodes] = nodes
+        right[nodes] = nodes
+
+    leaf = left == ids
+    feature[leaf] = _LEAF_FEATURE
+    threshold[leaf] = _LEAF_THRESHOLD
+    missing_left[leaf] = False
+    merged = CompiledForest(
+        feature=feature, threshold=threshold, left=left, right=right,
+        missing_left=missing_left, value=value, leaf_class=leaf_class,
+        roots=np.asarray(engine.roots, dtype=np.intp), depth=engine.depth, classes=engine.classes,
+    )
+    return extract_trees(merged, range(merged.n_trees))
+
+
+def extract_trees(engine, trees):
+    # Nuevo motor con solo los árboles indicados, sin nodos inalcanzables y renumerado en BFS
+    features, thresholds, lefts, rights, missing, values, leaf_classes, roots = [], [], [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for t in trees:
+        order = [int(engine.roots[t])]
+        levels = [0]
+        position = {order[0]: 0}
+        i = 0
+        # Recorrido por niveles: cada árbol queda contiguo y en orden canónico
+        while i < len(order):
+            node = order[i]
+            if engine.left[node] != node:
+                for child in (int(engine.left[node]), int(engine.right[node])):
+                    position[child] = len(order)
+                    order.append(child)
+                    levels.append(levels[i] + 1)
+            i += 1
+        order = np.asarray(order, dtype=np.intp)
+        local = np.arange(order.size)
+        is_leaf = engine.left[order] == order
+        remap = np.vectorize(position.get, otypes=[np.intp])
+
+        lefts.append(np.where(is_leaf, local, remap(engine.left[order])) + offset)
+        rights.append(np.where(is_leaf, local, remap(engine.right[order])) + offset)
+        features.append(np.asarray(engine.feature)[order])
+        thresholds.append(np.asarray(engine.threshold)[order])
+        missing.append(np.asarray(engine.missing_left)[order])
+        values.append(np.asarray(engine.value)[order])
+        leaf_classes.append(np.asarray(engine.leaf_class)[order])
+        roots.append(offset)
+        depth = max(depth, max(levels))
+        offset += order.size
+
+    return CompiledForest(
+        feature=np.concatenate(features).astype(np.intp),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.intp),
+        right=np.concatenate(rights).astype(np.intp),
+        missing_left=np.concatenate(missing).astype(bool),
+        value=np.ascontiguousarray(np.vstack(values)),
+        leaf_class=np.concatenate(leaf_classes).astype(np.intp),
+        roots=np.asarray(roots, dtype=np.intp),
+        depth=depth,
+        classes=engine.classes,
+    )
+
+
+def _tree_signature(engine, start, end):
+    # Huella de un árbol en orden canónico (requiere árboles renumerados con extract_trees)
+    parts = (
+        np.asarray(engine.feature[start:end], dtype=np.int64),
+        np.asarray(engine.threshold[start:end], dtype=np.float64),
+        np.asarray(engine.left[start:end], dtype=np.int64) - start,
+        np.asarray(engine.right[start:end], dtype=np.int64) - start,
+        np.asarray(engine.missing_left[start:end], dtype=bool),
+        np.asarray(engine.leaf_class[start:end], dtype=np.int64),
+        np.asarray(engine.value[start:end], dtype=np.float64),
+    )
+    return b"".join(p.tobytes() for p in parts)
+
+
+def unique_trees(engine):
+    # Índices de la primera aparición de cada árbol distinto
+    seen = set()
+    kept = []
+    for t, (start, end) in enumerate(_tree_bounds(engine)):
+        signature = _tree_signature(engine, start, end)
+        if signature not in seen:
+            seen.add(signature)
+            kept.append(t)
+    return kept
+
+
+def _vote(counts, proba):
+    # Voto duro con desempate por probas, igual que SimpleRandomForest.predict
+    top = counts.max(axis=1)
+    hard = np.argmax(counts, axis=1)
+    ties = (counts == top[:, np.newaxis]).sum(axis=1) > 1
+    if np.any(ties):
+        hard[ties] = np.argmax(proba[ties], axis=1)
+    return hard
+
+
+def select_trees(engine, X, y, tolerance=0.0, min_trees=1):
+    # Selección voraz hacia adelante: agrega el árbol que más sube la exactitud hasta alcanzar la meta
+    classes = np.asarray(engine.classes)
+    target = np.searchsorted(classes, np.asarray(y))
+    leaves = engine.apply(X)
+    votes = engine.votes(leaves)
+    probas = np.asarray(engine.value)[leaves]
+    n_trees, n = votes.shape
+    n_classes = classes.size
+    onehot = np.zeros((n_trees, n, n_classes))
+    onehot[np.arange(n_trees)[:, None], np.arange(n)[None, :], votes] = 1.0
+
+    full = np.mean(_vote(onehot.sum(axis=0), probas.sum(axis=0)) == target)
+    goal = full - tolerance
+
+    counts = np.zeros((n, n_classes))
+    proba = np.zeros((n, n_classes))
+    chosen = []
+    remaining = list(range(n_trees))
+    accuracy = 0.0
+    while remaining:
+        scores = [np.mean(_vote(counts + onehot[t], proba + probas[t]) == target) for t in remaining]
+        best = remaining.pop(int(np.argmax(scores)))
+        chosen.append(best)
+        counts += onehot[best]
+        proba += probas[best]
+        accuracy = max(scores)
+        if len(chosen) >= min_trees and accuracy >= goal:
+            break
+    return sorted(chosen), float(full), float(accuracy)
+
+
+def as_stored(engine):
+    # Copia con los dtypes del artefacto SRFA, para comparar memoria y latencia en igualdad
+    arrays = {name: np.ascontiguousarray(getattr(engine, name), dtype=dtype) for name, dtype in _ENGINE_ARRAYS.items()}
+    return CompiledForest(depth=engine.depth, classes=engine.classes, **arrays)
+
+
+def engine_nbytes(engine):
+    return int(sum(np.asarray(getattr(engine, name)).nbytes for name in _ENGINE_ARRAYS))
+
+
+def _latency(forest, X, repeat=50):
+    # Mediana en segundos de predict sobre X
+    forest.predict(X)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        forest.predict(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def _with_engine(template, engine, kept):
+    # SimpleRandomForest solo con motor compilado, como el que regresa load_forest
+    forest = SimpleRandomForest(
+        n_estimators=len(kept),
+        max_features=template.max_features,
+        max_depth=template.max_depth,
+        oob_score=template.oob_score,
+        random_state=template.random_state,
+    )
+    forest.classes_ = template.classes_
+    forest.oob_score_ = template.oob_score_
+    forest.feat_idx_ = [template.feat_idx_[t] for t in kept]
+    forest.engine_ = engine
+    return forest
+
+
+def compact_forest(forest, X, y, merge=True, dedupe=True, select=False, tolerance=0.0, min_trees=1,
+                   same_class=False):
+    # Aplica los pasos pedidos y regresa (bosque compacto, reporte)
+    if not forest.compiled:
+        forest.compile()
+    X = np.asarray(X)
+    y = np.ravel(np.asarray(y))
+    engine = forest.engine_
+    kept = list(range(engine.n_trees))
+    report = {"steps": [], "merge_same_class": bool(merge and same_class)}
+
+    def record(step, current):
+        report["steps"].append({
+            "step": step,
+            "n_trees": current.n_trees,
+            "node_count": current.node_count,
+            "depth": current.depth,
+        })
+
+    record("original", engine)
+    if merge:
+        engine = merge_leaves(engine, same_class=same_class)
+        record("merge_leaves", engine)
+    if dedupe:
+        unique = unique_trees(engine if merge else extract_trees(engine, range(engine.n_trees)))
+        engine = extract_trees(engine, unique)
+        kept = [kept[t] for t in unique]
+        record("dedupe", engine)
+    if select:
+        chosen, _, _ = select_trees(engine, X, y, tolerance=tolerance, min_trees=min_trees)
+        engine = extract_trees(engine, chosen)
+        kept = [kept[t] for t in chosen]
+        record("select", engine)
+
+    original = _with_engine(forest, as_stored(forest.engine_), range(forest.engine_.n_trees))
+    compact = _with_engine(forest, as_stored(engine), kept)
+    original_labels = original.predict(X)
+    compact_labels = compact.predict(X)
+    proba_difference = np.abs(original.predict_proba(X) - compact.predict_proba(X)).max()
+    batch = X[:1]
+    report.update({
+        "kept_trees": kept,
+        "nodes_before": original.engine_.node_count,
+        "nodes_after": compact.engine_.node_count,
+        "bytes_before": engine_nbytes(original.engine_),
+        "bytes_after": engine_nbytes(compact.engine_),
+        "accuracy_before": float(np.mean(original_labels == y)),
+        "accuracy_after": float(np.mean(compact_labels == y)),
+        "agreement": float(np.mean(original_labels == compact_labels)),
+        "max_proba_difference": float(proba_difference),
+        "latency_batch_1_before_s": _latency(original, batch),
+        "latency_batch_1_after_s": _latency(compact, batch),
+        "latency_batch_n_before_s": _latency(original, X),
+        "latency_batch_n_after_s": _latency(compact, X),
+        "batch_n": int(X.shape[0]),
+    })
+    return compact, report
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class CompiledForest:
+    """Bosque empaquetado en arreglos planos de NumPy para inferencia vectorizada.
+
+    Todos los nodos de todos los árboles viven en los mismos arreglos; cada
+    árbol conserva su raíz en ``roots``. Las hojas apuntan a sí mismas, así
+    que recorrer ``depth`` niveles deja a cada fila en su hoja sin ramas.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, leaf_class, roots, depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.leaf_class = leaf_class
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes = classes
+
+    @classmethod
+    def from_trees(cls, trees, feat_idx, classes):
+        # Empaqueta los tree_ de sklearn remapeando variables y clases a índices globales
+        classes = np.asarray(classes)
+        features, thresholds, lefts, rights, values, leaf_classes, roots = [], [], [], [], [], [], []
+        missing_lefts = []
+        offset = 0
+        depth = 0
+        for tree, feats in zip(trees, feat_idx):
+            t = tree.tree_
+            n_nodes = t.node_count
+            is_leaf = t.children_left == -1
+            ids = np.arange(n_nodes)
+
+            # Variables locales del árbol -> columnas de X
+            feat = np.where(is_leaf, 0, np.asarray(feats)[np.maximum(t.feature, 0)])
+            left = np.where(is_leaf, ids, t.children_left) + offset
+            right = np.where(is_leaf, ids, t.children_right) + offset
+            # Árboles sin soporte de faltantes mandan NaN a la derecha
+            missing_left = getattr(t, "missing_go_to_left", np.zeros(n_nodes, dtype=np.uint8))
+
+            # Reproduce predict_proba del árbol en el espacio global de clases
+            raw = t.value[:, 0, :tree.n_classes_]
+            sums = raw.sum(axis=1)
+            if not np.allclose(sums, 1.0):
+                normalizer = sums[:, np.newaxis].copy()
+                normalizer[normalizer == 0.0] = 1.0
+                raw = raw / normalizer
+            cols = np.searchsorted(classes, tree.classes_)
+            value = np.zeros((n_nodes, classes.size), dtype=np.float64)
+            value[:, cols] = raw
+            leaf_class = cols[np.argmax(t.value[:, 0, :tree.n_classes_], axis=1)]
+
+            features.append(feat)
+            thresholds.append(t.threshold)
+            lefts.append(left)
+            rights.append(right)
+            missing_lefts.append(missing_left)
+            values.append(value)
+            leaf_classes.append(leaf_class)
+            roots.append(offset)
+            depth = max(depth, t.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing_lefts).astype(bool),
+            value=np.ascontiguousarray(np.vstack(values)),
+            leaf_class=np.concatenate(leaf_classes).astype(np.intp),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=depth,
+            classes=classes,
+        )
+
+    @property
+    def n_trees(self):
+        return int(self.roots.size)
+
+    @property
+    def node_count(self):
+        return int(self.feature.size)
+
+    @staticmethod
+    def _as_input(X):
+        # sklearn compara en float32 contra umbrales float64; se replica igual
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            raise ValueError("X debe ser una matriz 2D.")
+        return X.astype(np.float64)
+
+    def apply(self, X, trees=None):
+        # Regresa la hoja alcanzada por cada (árbol, fila): forma (T, n)
+        X = self._as_input(X)
+        roots = self.roots if trees is None else self.roots[trees]
+        nodes = np.repeat(roots[:, np.newaxis], X.shape[0], axis=1)
+        rows = np.arange(X.shape[0])
+        has_nan = np.isnan(X).any()
+        for _ in range(self.depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def votes(self, leaves):
+        # Índice de clase votado por cada (árbol, fila)
+        return self.leaf_class[leaves]
+
+    def proba(self, leaves):
+        # Promedio de probas por hoja, sumando árboles en orden
+        proba = np.add.reduce(self.value[leaves], axis=0)
+        proba /= leaves.shape[0]
+        return proba
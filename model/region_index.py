@@ -0,0 +1,113 @@
+"""
+Índice de regiones de decisión para SimpleRandomForest.
+
+Con pocas variables, los umbrales de todos los árboles parten el espacio en
+una rejilla finita de celdas y el bosque asigna la misma clase a toda una
+celda. El índice guarda, por variable, sus umbrales únicos ordenados y una
+tabla con la predicción del ensamble (desempates incluidos) para cada celda.
+Predecir es entonces una búsqueda binaria por variable y una lectura.
+
+La comparación replica al motor compilado: ``x`` se convierte a float32 y
+luego a float64, y va a la izquierda si ``x <= umbral``. La celda de ``x`` en
+una variable es el número de umbrales estrictamente menores que ``x``
+(``searchsorted(side="left")``), así que coincide exactamente con el recorrido
+de los árboles. Las filas con NaN se resuelven con el motor.
+"""
+import numpy as np
+
+
+class RegionIndex:
+    """Tabla de predicciones por celda de la rejilla de umbrales del bosque."""
+
+    def __init__(self, thresholds, table):
+        self.thresholds = [np.asarray(t, dtype=np.float64) for t in thresholds]
+        self.shape = tuple(t.size + 1 for t in self.thresholds)
+        self.table = np.asarray(table).reshape(-1)
+        if self.table.size != int(np.prod(self.shape, dtype=np.int64)):
+            raise ValueError("La tabla no coincide con la rejilla de umbrales.")
+
+    @property
+    def n_features(self):
+        return len(self.thresholds)
+
+    @property
+    def n_cells(self):
+        return int(self.table.size)
+
+    @property
+    def nbytes(self):
+        return int(self.table.nbytes + sum(t.nbytes for t in self.thresholds))
+
+    @staticmethod
+    def grid(engine):
+        # Umbrales únicos por variable de todos los nodos internos del motor
+        internal = engine.left != np.arange(engine.node_count)
+        n_features = int(np.max(engine.feature[internal])) + 1 if internal.any() else 0
+        return [np.unique(engine.threshold[internal & (engine.feature == j)]) for j in range(n_features)]
+
+    @classmethod
+    def build(cls, forest, max_cells=50_000_000, chunk_cells=65_536):
+        # Evalúa el bosque en cada celda por bloques, usando rangos de umbral en vez de valores
+        engine = forest.engine_
+        thresholds = cls.grid(engine)
+        shape = tuple(t.size + 1 for t in thresholds)
+        n_cells = int(np.prod(shape, dtype=np.int64))
+        if n_cells > max_cells:
+            raise ValueError(f"La rejilla tiene {n_cells} celdas, más que el límite de {max_cells}.")
+
+        # Para cada nodo interno, posición de su umbral en la lista de su variable: c <= rango <=> x <= umbral
+        ids = np.arange(engine.node_count)
+        internal = engine.left != ids
+        feature = np.asarray(engine.feature, dtype=np.intp)
+        rank = np.zeros(engine.node_count, dtype=np.intp)
+        for j, values in enumerate(thresholds):
+            nodes = internal & (feature == j)
+            rank[nodes] = np.searchsorted(values, engine.threshold[nodes])
+        left = np.asarray(engine.left, dtype=np.intp)
+        right = np.asarray(engine.right, dtype=np.intp)
+        roots = np.asarray(engine.roots, dtype=np.intp)
+
+        dtype = np.uint8 if forest.classes_.size <= 256 else np.uint16
+        table = np.empty(n_cells, dtype=dtype)
+        for start in range(0, n_cells, chunk_cells):
+            flat = np.arange(start, min(start + chunk_cells, n_cells))
+            coords = np.stack(np.unravel_index(flat, shape), axis=1) if shape else np.zeros((flat.size, 0), np.intp)
+            rows = np.arange(flat.size)
+            nodes = np.repeat(roots[:, np.newaxis], flat.size, axis=1)
+            for _ in range(engine.depth):
+                c = coords[rows, feature[nodes]] if shape else np.zeros_like(nodes)
+                nodes = np.where(c <= rank[nodes], left[nodes], right[nodes])
+            table[start:start + flat.size] = forest._vote_leaves(nodes)
+        return cls(thresholds, table)
+
+    def cells(self, X):
+        # Celda plana de cada fila; X ya convertido como en el motor
+        coords = tuple(np.searchsorted(t, X[:, j], side="left") for j, t in enumerate(self.thresholds))
+        if not coords:
+            return np.zeros(X.shape[0], dtype=np.intp)
+        return np.ravel_multi_index(coords, self.shape)
+
+    def lookup(self, X):
+        # (índice de clase por fila, máscara de filas con NaN); esas filas no caen en una celda fija
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] < self.n_features:
+            raise ValueError("X debe ser una matriz 2D con todas las variables del modelo.")
+        missing = np.isnan(X[:, :self.n_features]).any(axis=1)
+        if missing.any():
+            hard = np.zeros(X.shape[0], dtype=np.intp)
+            hard[~missing] = self.table[self.cells(X[~missing])]
+            return hard, missing
+        return self.table[self.cells(X)].astype(np.intp), missing
+
+    def to_arrays(self):
+        # Arreglos planos para guardarlo en el artefacto SRFA
+        return {
+            "region_thresholds": np.concatenate(self.thresholds) if self.thresholds else np.zeros(0),
+            "region_ptr": np.cumsum([0] + [t.size for t in self.thresholds]),
+            "region_table": self.table,
+        }
+
+    @classmethod
+    def from_arrays(cls, region_thresholds, region_ptr, region_table):
+        thresholds = [region_thresholds[region_ptr[i]:region_ptr[i + 1]] for i in range(len(region_ptr) - 1)]
+        return cls(thresholds, region_table)
@@ -1,34 +1,47 @@
 import numpy as np
+from joblib import Parallel, delayed
 from sklearn.tree import DecisionTreeClassifier
-from collections import Counter
+from model.forest_engine import CompiledForest
+
+
+def _fit_tree(X, y, idx, oob_idx, feats, seed, max_depth):
+    # Ajusta un árbol sobre su muestra bootstrap; regresa también sus probas OOB
+    tree = DecisionTreeClassifier(max_depth=max_depth, random_state=seed)
+    tree.fit(X[idx][:, feats], y[idx])
+    oob_proba = None
+    if oob_idx is not None and oob_idx.size > 0:
+        oob_proba = tree.predict_proba(X[oob_idx][:, feats])
+    return tree, oob_proba
+
 
 class SimpleRandomForest:
-    def __init__(self, n_estimators=200, max_features="sqrt", max_depth=None, oob_score=False, random_state=42):
+    def __init__(self, n_estimators=200, max_features="sqrt", max_depth=None, oob_score=False, random_state=42, n_jobs=None):
         # Guarda hiperparámetros
         self.n_estimators = n_estimators
         self.max_features = max_features
         self.max_depth = max_depth
         self.oob_score = oob_score
         self.random_state = random_state
+        # Número de árboles ajustados en paralelo (None = secuencial, -1 = todos los núcleos)
+        self.n_jobs = n_jobs
         # Inicializa estado
         self.trees_ = []
         self.feat_idx_ = []
         self.classes_ = None
         self.oob_score_ = None
+        self.engine_ = None
+        self.region_index_ = None
         self._rng = np.random.default_rng(random_state)
 
-    def _bootstrap_sample(self, X, y):
+    def _bootstrap_indices(self, n):
         # Toma muestra con reemplazo
-        n = X.shape[0]
         idx = self._rng.integers(0, n, size=n)
         if self.oob_score:
             # Calcula índices fuera de bolsa
-            all_idx = np.arange(n)
             mask = np.ones(n, dtype=bool)
             mask[idx] = False
-            oob_idx = all_idx[mask]
-            return X[idx], y[idx], oob_idx
-        return X[idx], y[idx], None
+            return idx, np.flatnonzero(mask)
+        return idx, None
 
     def _feature_subset(self, p):
         # Selecciona subconjunto de variables para el árbol
@@ -53,51 +66,73 @@ class SimpleRandomForest:
         self.trees_.clear()
         self.feat_idx_.clear()
         self.oob_score_ = None
+        self.engine_ = None
+        self.region_index_ = None
 
         # Guarda clases
         self.classes_ = np.unique(y)
 
-        # Prepara semillas y acumuladores OOB
+        # Sortea semillas, muestras y variables en el mismo orden que el ajuste secuencial,
+        # así el resultado no depende de n_jobs
         seeds = self._rng.integers(0, 10_000_000, size=self.n_estimators)
-        if self.oob_score:
-            oob_sum = {}
-            oob_cnt = {}
-
+        draws = []
         for s in seeds:
-            Xb, yb, oob_idx = self._bootstrap_sample(X, y)
+            idx, oob_idx = self._bootstrap_indices(n)
             feats = self._feature_subset(p)
+            draws.append((int(s), idx, oob_idx, feats))
 
-            tree = DecisionTreeClassifier(max_depth=self.max_depth, random_state=int(s))
-            tree.fit(Xb[:, feats], yb)
+        # Ajusta los árboles en paralelo; los hilos comparten X sin copiarlo
+        results = Parallel(n_jobs=getattr(self, "n_jobs", None), prefer="threads")(
+            delayed(_fit_tree)(X, y, idx, oob_idx, feats, s, self.max_depth)
+            for s, idx, oob_idx, feats in draws
+        )
 
+        # Acumula predicciones OOB en arreglos densos, en el orden de los árboles
+        if self.oob_score:
+            oob_sum = np.zeros((n, self.classes_.size))
+            oob_cnt = np.zeros(n, dtype=np.int64)
+
+        for (tree, oob_proba), (_, _, oob_idx, feats) in zip(results, draws):
             self.trees_.append(tree)
             self.feat_idx_.append(feats)
-
-            # Acumula predicciones OOB
             if self.oob_score and oob_idx.size > 0:
-                proba = tree.predict_proba(X[oob_idx][:, feats])
-                for i, idx in enumerate(oob_idx):
-                    if idx not in oob_sum:
-                        oob_sum[idx] = proba[i].copy()
-                        oob_cnt[idx] = 1
-                    else:
-                        oob_sum[idx] += proba[i]
-                        oob_cnt[idx] += 1
+                cols = np.searchsorted(self.classes_, tree.classes_)
+                oob_sum[oob_idx[:, np.newaxis], cols] += oob_proba
+                oob_cnt[oob_idx] += 1
 
         # Calcula métrica OOB
-        if self.oob_score and len(oob_cnt) > 0:
-            idxs = np.array(list(oob_cnt.keys()))
-            proba = np.vstack([oob_sum[i] / oob_cnt[i] for i in idxs])
+        if self.oob_score and np.any(oob_cnt > 0):
+            idxs = np.flatnonzero(oob_cnt)
+            proba = oob_sum[idxs] / oob_cnt[idxs, np.newaxis]
             y_hat = self.classes_[np.argmax(proba, axis=1)]
             self.oob_score_ = float(np.mean(y[idxs] == y_hat))
 
         return self
 
-    def predict_proba(self, X):
-        # Calcula probas promedio del ensamble
+    def compile(self):
+        # Empaqueta los árboles en arreglos planos para inferencia sin llamadas a sklearn
         if not self.trees_:
+            # Cargado de un artefacto: ya trae el motor y no hay árboles de sklearn
+            self._check_fitted()
+            return self
+        self.engine_ = CompiledForest.from_trees(self.trees_, self.feat_idx_, self.classes_)
+        return self
+
+    @property
+    def compiled(self):
+        # Modelos serializados antes de existir el motor no traen engine_
+        return getattr(self, "engine_", None) is not None
+
+    def _check_fitted(self):
+        if not self.trees_ and not self.compiled:
             raise ValueError("El modelo no está ajustado.")
+
+    def predict_proba(self, X):
+        # Calcula probas promedio del ensamble
+        self._check_fitted()
         X = np.asarray(X)
+        if self.compiled:
+            return self.engine_.proba(self.engine_.apply(X))
         proba = None
         for t, f in zip(self.trees_, self.feat_idx_):
             p = t.predict_proba(X[:, f])
@@ -105,27 +140,133 @@ class SimpleRandomForest:
         proba /= len(self.trees_)
         return proba
 
+    def _tree_outputs(self, X):
+        # Evalúa cada árbol sklearn una sola vez: probas (T, n, C) y votos (T, n)
+        probas = np.zeros((len(self.trees_), X.shape[0], self.classes_.size))
+        for i, (t, f) in enumerate(zip(self.trees_, self.feat_idx_)):
+            cols = np.searchsorted(self.classes_, t.classes_)
+            probas[i][:, cols] = t.predict_proba(X[:, f])
+        votes = np.argmax(probas, axis=2)
+        return probas, votes
+
+    def _tally(self, votes):
+        # Cuenta votos por (fila, clase) con un solo bincount
+        n_classes = self.classes_.size
+        n = votes.shape[1]
+        flat = votes + n_classes * np.arange(n)
+        return np.bincount(flat.ravel(), minlength=n * n_classes).reshape(n, n_classes)
+
+    def _vote_leaves(self, leaves):
+        # Índice de clase ganadora a partir de las hojas del motor compilado (T, n)
+        counts = self._tally(self.engine_.votes(leaves))
+        top = counts.max(axis=1)
+        hard = np.argmax(counts, axis=1)
+        ties = (counts == top[:, np.newaxis]).sum(axis=1) > 1
+        if np.any(ties):
+            hard[ties] = np.argmax(self.engine_.proba(leaves[:, ties]), axis=1)
+        return hard
+
+    def build_region_index(self, max_cells=50_000_000):
+        # Precalcula la predicción de cada celda de la rejilla de umbrales (requiere el motor)
+        from model.region_index import RegionIndex
+        if not self.compiled:
+            self.compile()
+        self.region_index_ = RegionIndex.build(self, max_cells=max_cells)
+        return self
+
     def predict(self, X):
         # Aplica voto duro con desempate por promedios de probas
-        if not self.trees_:
-            raise ValueError("El modelo no está ajustado.")
+        self._check_fitted()
         X = np.asarray(X)
 
-        preds = [t.predict(X[:, f]) for t, f in zip(self.trees_, self.feat_idx_)]
-        votes = np.vstack(preds).T
+        # Con índice de regiones: búsquedas binarias y una lectura; las filas con NaN van al motor
+        index = getattr(self, "region_index_", None)
+        if index is not None:
+            hard, missing = index.lookup(X)
+            if missing.any():
+                hard[missing] = self._vote_leaves(self.engine_.apply(X[missing]))
+            return self.classes_[hard]
 
-        hard = np.array([Counter(row).most_common(1)[0][0] for row in votes])
+        if self.compiled:
+            return self.classes_[self._vote_leaves(self.engine_.apply(X))]
 
-        # Detecta empates y desempata con voto blando
-        ties = []
-        for row in votes:
-            c = Counter(row)
-            top = c.most_common(1)[0][1]
-            ties.append(sum(v == top for v in c.values()) > 1)
-        ties = np.array(ties, dtype=bool)
+        probas, votes = self._tree_outputs(X)
+        counts = self._tally(votes)
+        top = counts.max(axis=1)
+        hard = np.argmax(counts, axis=1)
 
+        # Detecta empates y desempata con voto blando reutilizando las salidas por árbol
+        ties = (counts == top[:, np.newaxis]).sum(axis=1) > 1
         if np.any(ties):
-            soft = self.classes_[np.argmax(self.predict_proba(X[ties]), axis=1)]
-            hard[ties] = soft
+            proba = np.add.reduce(probas[:, ties], axis=0) / len(self.trees_)
+            hard[ties] = np.argmax(proba, axis=1)
 
-        return hard
+        return self.classes_[hard]
+
+    def predict_adaptive(self, X, chunk_size=4):
+        # Voto duro evaluando árboles por bloques; una fila se detiene cuando su clase líder ya no
+        # puede ser alcanzada. Regresa (etiquetas, árboles evaluados por fila) con las mismas
+        # etiquetas que predict
+        self._check_fitted()
+        if not self.compiled:
+            self.compile()
+        X = np.asarray(X)
+        engine = self.engine_
+        n_trees = engine.n_trees
+        n = X.shape[0]
+
+        counts = np.zeros((n, self.classes_.size), dtype=np.int64)
+        evaluated = np.zeros(n, dtype=np.int64)
+        hard = np.zeros(n, dtype=np.intp)
+        active = np.arange(n)
+
+        start = 0
+        gap = np.zeros(n, dtype=np.int64)
+        while active.size and start < n_trees:
+            # Ninguna fila se decide antes de que su ventaja pueda superar a los árboles restantes,
+            # así que el bloque cubre al menos los que necesita la fila más cercana a decidirse
+            remaining = n_trees - start
+            needed = int(np.min(remaining - gap[active])) // 2 + 1
+            end = min(n_trees, start + max(chunk_size, needed))
+            leaves = engine.apply(X[active], trees=np.arange(start, end))
+            counts[active] += self._tally(engine.votes(leaves))
+            evaluated[active] = end
+
+            # Decidida si la ventaja sobre la segunda clase supera los árboles restantes (estricto:
+            # con igualdad aún podría haber empate, que se resuelve con probas)
+            ordered = np.sort(counts[active], axis=1)
+            gap[active] = ordered[:, -1] - ordered[:, -2] if ordered.shape[1] > 1 else n_trees
+            decided = gap[active] > n_trees - end
+            hard[active[decided]] = np.argmax(counts[active[decided]], axis=1)
+            active = active[~decided]
+            start = end
+
+        # Solo quedan filas empatadas con todos los árboles: desempate con el promedio completo de probas
+        if active.size:
+            hard[active] = np.argmax(engine.proba(engine.apply(X[active])), axis=1)
+
+        return self.classes_[hard], evaluated
+
+    def predict_with_proba(self, X):
+        # Etiquetas (voto duro) y probas promedio con un solo recorrido del bosque
+        self._check_fitted()
+        X = np.asarray(X)
+
+        if self.compiled:
+            leaves = self.engine_.apply(X)
+            votes = self.engine_.votes(leaves)
+            proba = self.engine_.proba(leaves)
+        else:
+            probas, votes = self._tree_outputs(X)
+            proba = np.add.reduce(probas, axis=0) / len(self.trees_)
+
+        counts = self._tally(votes)
+        top = counts.max(axis=1)
+        hard = np.argmax(counts, axis=1)
+
+        # Mismo desempate que predict, con las probas ya calculadas
+        ties = (counts == top[:, np.newaxis]).sum(axis=1) > 1
+        if np.any(ties):
+            hard[ties] = np.argmax(proba[ties], axis=1)
+
+        return self.classes_[hard], proba
@@ -0,0 +1,251 @@
+"""
+Suite de benchmarks en proceso para SimpleRandomForest y la ruta /predict.
+
+No necesita un servidor corriendo: el modelo se invoca directamente y la
+API se ejercita con un cliente ASGI en memoria, así que no hay ruido de red.
+Los resultados se guardan en JSON y se comparan contra la línea base
+versionada en benchmarks/baseline.json. La comparación solo es una
+compuerta si la máquina coincide con la de la línea base (arquitectura,
+número de CPUs y versión de Python) o se pide --strict: entonces, si algún
+caso empeora más que la tolerancia, o no hay línea base, el script termina
+con código 1. En otra máquina la tabla se imprime solo como referencia.
+
+Uso:
+    python scripts/benchmark.py --save-baseline     # registra la línea base
+    python scripts/benchmark.py                     # compara contra ella
+    python scripts/benchmark.py --strict            # falla aunque la máquina sea otra
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+SEED = 42
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results.json")
+
+
+def measure(fn, repeat, warmup=3):
+    """Ejecutar fn varias veces y regresar mediana y p95 en segundos"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "median_s": statistics.median(times),
+        "p95_s": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "repeat": repeat,
+    }
+
+
+async def measure_async(fn, repeat, warmup=3):
+    """Versión asíncrona de measure"""
+    for _ in range(warmup):
+        await fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "median_s": statistics.median(times),
+        "p95_s": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "repeat": repeat,
+    }
+
+
+def load_training_data():
+    """Filas del conjunto de entrenamiento del notebook"""
+    df = pd.read_csv(os.path.join(ROOT, "notebooks", "iris_train.csv"))
+    return df.drop(columns=["target"]).to_numpy(), df["target"].to_numpy()
+
+
+def bench_model(results, repeat):
+    """Benchmarks de fit, predict y predict_proba"""
+    from model.rf_custom import SimpleRandomForest
+    from app.services.inference import load_model
+
+    X, y = load_training_data()
+    print("🌲 fit")
+    results["fit/n_estimators=50"] = measure(
+        lambda: SimpleRandomForest(n_estimators=50, random_state=SEED).fit(X, y),
+        repeat=max(3, repeat // 10)
+    )
+
+    model = load_model()
+    rng = np.random.default_rng(SEED)
+    for size in BATCH_SIZES:
+        rows = rng.uniform(0, 8, size=(size, 4))
+        n = max(3, repeat // max(1, size // 100))
+        print(f"🔮 predict / predict_proba batch={size}")
+        results[f"predict/batch={size}"] = measure(lambda: model.predict(rows), n)
+        results[f"predict_proba/batch={size}"] = measure(lambda: model.predict_proba(rows), n)
+
+
+def bench_cache(results, repeat):
+    """Benchmarks de la ruta con caché: aciertos y fallos"""
+    from app.services.cache import PredictionCache
+    from app.services.inference import model_version, predict_one
+
+    version = model_version()
+    rng = np.random.default_rng(SEED)
+
+    def cached_predict(cache, features):
+        index = cache.get(features, version)
+        if index is None:
+            index = predict_one(features)
+            cache.put(features, index, version)
+        return index
+
+    print("💾 caché (aciertos)")
+    hot = PredictionCache(capacity=1000)
+    row = tuple(rng.uniform(0, 8, size=4).tolist())
+    cached_predict(hot, row)
+    results["cached_predict/hit"] = measure(lambda: cached_predict(hot, row), repeat * 10)
+
+    print("💾 caché (fallos)")
+    cold = PredictionCache(capacity=1000)
+    misses = iter([tuple(r) for r in rng.uniform(0, 8, size=(repeat * 2 + 10, 4)).tolist()])
+    results["cached_predict/miss"] = measure(lambda: cached_predict(cold, next(misses)), repeat)
+
+
+async def bench_api(results, repeat):
+    """Benchmark de /predict completo a través de un cliente ASGI en proceso"""
+    import httpx
+    from app.main import app, lifespan
+    from app.services.warmup import readiness
+
+    rng = np.random.default_rng(SEED)
+    async with lifespan(app):
+        while not readiness.ready and readiness.error is None:
+            await asyncio.sleep(0.01)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print("🌐 POST /predict (acierto de caché)")
+            body = {"features": [5.1, 3.5, 1.4, 0.2]}
+            results["api/predict/hit"] = await measure_async(lambda: client.post("/predict", json=body), repeat)
+
+            print("🌐 POST /predict (fallo de caché)")
+            rows = iter(rng.uniform(0, 8, size=(repeat * 2 + 10, 4)).tolist())
+            results["api/predict/miss"] = await measure_async(
+                lambda: client.post("/predict", json={"features": next(rows)}), repeat
+            )
+
+            print("🌐 POST /predict/batch batch=1000")
+            batch = {"instances": rng.uniform(0, 8, size=(1000, 4)).tolist()}
+            results["api/predict_batch/batch=1000"] = await measure_async(
+                lambda: client.post("/predict/batch", json=batch), max(3, repeat // 10)
+            )
+
+
+def compare(results, baseline, tolerance):
+    """Comparar medianas contra la línea base; regresa los casos que empeoraron"""
+    regressions = []
+    print(f"\n{'caso':<32} {'base µs':>12} {'actual µs':>12} {'cambio':>9}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>12} {current['median_s']*1e6:>12.1f} {'nuevo':>9}")
+            continue
+        change = current["median_s"] / base["median_s"] - 1
+        flag = " ❌" if change > tolerance else ""
+        print(f"{name:<32} {base['median_s']*1e6:>12.1f} {current['median_s']*1e6:>12.1f} {change*100:>8.1f}%{flag}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def environment():
+    """Datos de la máquina que hacen comparables dos corridas"""
+    return {
+        "python": ".".join(platform.python_version_tuple()[:2]),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def mismatches(baseline):
+    """Diferencias entre esta máquina y la que registró la línea base"""
+    current = environment()
+    recorded = {
+        "python": ".".join(str(baseline.get("python", "")).split(".")[:2]),
+        "machine": baseline.get("machine"),
+        "cpu_count": baseline.get("cpu_count"),
+    }
+    return [f"{key}: {recorded[key]} → {current[key]}" for key in current if recorded[key] != current[key]]
+
+
+def main():
+    """Ejecutar la suite y comparar contra la línea base"""
+    parser = argparse.ArgumentParser(description="Benchmarks en proceso de la API de ensamble")
+    parser.add_argument("--repeat", type=int, default=200, help="Repeticiones por caso")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como nueva línea base")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Empeoramiento máximo permitido (0.25 = 25%%)")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fallar ante regresiones aunque la máquina no coincida con la de la línea base")
+    args = parser.parse_args()
+
+    np.random.seed(SEED)
+    cases = {}
+    bench_model(cases, args.repeat)
+    bench_cache(cases, args.repeat)
+    asyncio.run(bench_api(cases, args.repeat))
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "seed": SEED,
+        "results": cases,
+    }
+    target = args.baseline if args.save_baseline else args.output
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Resultados guardados en: {target}")
+
+    if args.save_baseline:
+        return
+    if not os.path.exists(args.baseline):
+        print(f"❌ No hay línea base en {args.baseline}; ejecute con --save-baseline para registrarla")
+        sys.exit(1)
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(cases, baseline["results"], args.tolerance)
+    different = mismatches(baseline)
+    if different and not args.strict:
+        # Tiempos de otra máquina no dicen nada del código; se reportan sin fallar
+        print(f"\n⚠️  La línea base es de otra máquina ({'; '.join(different)}); comparación solo informativa")
+        if regressions:
+            print(f"   Casos por encima de la tolerancia: {', '.join(regressions)}")
+        print("   Registre una línea base en esta máquina con --save-baseline, o use --strict")
+        return
+    if regressions:
+        print(f"\n❌ Regresiones mayores a {args.tolerance*100:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ Sin regresiones respecto a la línea base")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Script para compactar el modelo y guardarlo como artefacto SRFA.
+
+Fusiona hojas hermanas con distribuciones de clases idénticas (sin cambiar
+predicciones), elimina árboles duplicados y, con --select, busca el
+subconjunto más pequeño de árboles cuya exactitud queda dentro de
+--tolerance. Con --merge-same-class también fusiona hermanas que solo
+comparten la clase: elimina más nodos pero puede mover probabilidades y
+desempates, así que revise la concordancia y la diferencia de
+probabilidades del reporte. Reporta nodos, memoria y latencia antes y
+después para decidir si vale la pena publicar el modelo compacto.
+
+Uso:
+    python scripts/compact_model.py
+    python scripts/compact_model.py --merge-same-class
+    python scripts/compact_model.py --select --tolerance 0.01 --data holdout.csv
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import joblib
+import pandas as pd
+from model.artifact import load_forest, save_forest
+from model.compaction import compact_forest
+from model.rf_custom import SimpleRandomForest
+
+
+def load_source(path):
+    """Cargar el modelo fuente (SRFA o pickle) y sus métricas"""
+    if path.endswith(".srf"):
+        forest, header = load_forest(path, mmap=False)
+        return forest, header["metrics"]
+    # El pickle se generó desde un notebook, donde la clase vivía en __main__
+    sys.modules['__main__'].SimpleRandomForest = SimpleRandomForest
+    bundle = joblib.load(path)
+    metrics = {k: v for k, v in bundle.items() if k != 'est'}
+    return bundle['est'].compile(), metrics
+
+
+def main():
+    """Compactar el modelo y mostrar el ahorro"""
+    default_source = os.path.join(ROOT, "model", "model.srf")
+    if not os.path.exists(default_source):
+        default_source = os.path.join(ROOT, "model", "model.pkl")
+
+    parser = argparse.ArgumentParser(description="Compacta el bosque y lo guarda en formato SRFA")
+    parser.add_argument("--source", default=default_source)
+    parser.add_argument("--target", default=os.path.join(ROOT, "model", "model.compact.srf"))
+    parser.add_argument("--data", default=os.path.join(ROOT, "notebooks", "iris_train.csv"),
+                        help="CSV con columna target para medir exactitud")
+    parser.add_argument("--no-merge", action="store_true", help="No fusionar hojas hermanas")
+    parser.add_argument("--merge-same-class", action="store_true",
+                        help="Fusionar también hermanas de la misma clase con distribuciones distintas (con pérdida)")
+    parser.add_argument("--no-dedupe", action="store_true", help="No eliminar árboles duplicados")
+    parser.add_argument("--select", action="store_true", help="Elegir un subconjunto de árboles")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="Pérdida de exactitud permitida con --select")
+    parser.add_argument("--min-trees", type=int, default=1, help="Mínimo de árboles con --select")
+    parser.add_argument("--report", help="Ruta opcional para guardar el reporte en JSON")
+    args = parser.parse_args()
+
+    forest, metrics = load_source(args.source)
+    df = pd.read_csv(args.data)
+    X = df.drop(columns=["target"]).to_numpy()
+    y = df["target"].to_numpy()
+
+    compact, report = compact_forest(
+        forest, X, y,
+        merge=not args.no_merge,
+        same_class=args.merge_same_class,
+        dedupe=not args.no_dedupe,
+        select=args.select,
+        tolerance=args.tolerance,
+        min_trees=args.min_trees,
+    )
+    save_forest(compact, args.target, metrics={**metrics, "compaction": {
+        k: v for k, v in report.items() if not k.startswith("latency")
+    }})
+
+    def saving(before, after):
+        return f"{before} → {after} ({(1 - after / before) * 100:.1f}% menos)" if before else f"{before} → {after}"
+
+    print(f"✓ Modelo compacto escrito en: {args.target}")
+    if report["merge_same_class"]:
+        print("  ⚠️  Hojas fusionadas por clase: revise concordancia y diferencia de probabilidades")
+    else:
+        print("  • Hojas fusionadas solo con distribuciones idénticas: predicciones sin cambios")
+    for step in report["steps"]:
+        print(f"  • {step['step']:<13} árboles={step['n_trees']:<4} nodos={step['node_count']:<6} profundidad={step['depth']}")
+    print(f"  • Nodos: {saving(report['nodes_before'], report['nodes_after'])}")
+    print(f"  • Memoria (bytes): {saving(report['bytes_before'], report['bytes_after'])}")
+    print(f"  • Archivo: {os.path.getsize(args.source) / 1024:.1f} KiB → {os.path.getsize(args.target) / 1024:.1f} KiB")
+    print(f"  • Latencia batch=1: {report['latency_batch_1_before_s']*1e6:.0f}µs → {report['latency_batch_1_after_s']*1e6:.0f}µs")
+    print(f"  • Latencia batch={report['batch_n']}: "
+          f"{report['latency_batch_n_before_s']*1e6:.0f}µs → {report['latency_batch_n_after_s']*1e6:.0f}µs")
+    print(f"  • Exactitud: {report['accuracy_before']:.4f} → {report['accuracy_after']:.4f}")
+    print(f"  • Concordancia con el original: {report['agreement']:.4f}")
+    print(f"  • Diferencia máxima de probabilidades: {report['max_proba_difference']:.2e}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Reporte guardado en: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Script para convertir el modelo serializado con pickle (model/model.pkl)
+al artefacto SRFA basado en arreglos (model/model.srf).
+
+El artefacto se puede mapear en memoria, no requiere unpickling ni el
+truco de ``__main__`` y conserva las métricas de evaluación del pickle.
+También guarda el hash del pickle: si después se reentrena y el pickle
+cambia, el servicio deja de usar el artefacto viejo hasta volver a exportar.
+Con --region-index también guarda la tabla de regiones de decisión, así el
+servicio no tiene que construirla al arrancar.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import joblib
+import numpy as np
+from model.artifact import load_forest, save_forest
+from model.rf_custom import SimpleRandomForest
+
+
+def main():
+    """Exportar el pickle a SRFA y verificar que las predicciones coinciden"""
+    parser = argparse.ArgumentParser(description="Exporta model.pkl al formato SRFA")
+    parser.add_argument("--source", default=os.path.join(ROOT, "model", "model.pkl"))
+    parser.add_argument("--target", default=os.path.join(ROOT, "model", "model.srf"))
+    parser.add_argument("--region-index", action="store_true",
+                        help="Precalcular y guardar el índice de regiones de decisión")
+    parser.add_argument("--max-cells", type=int, default=50_000_000,
+                        help="Máximo de celdas del índice de regiones")
+    args = parser.parse_args()
+
+    # El pickle se generó desde un notebook, donde la clase vivía en __main__
+    sys.modules['__main__'].SimpleRandomForest = SimpleRandomForest
+
+    start = time.perf_counter()
+    bundle = joblib.load(args.source)
+    pickle_time = time.perf_counter() - start
+    forest = bundle['est'].compile()
+    metrics = {k: v for k, v in bundle.items() if k != 'est'}
+    if args.region_index:
+        start = time.perf_counter()
+        forest.build_region_index(max_cells=args.max_cells)
+        print(f"🧮 Índice de regiones: {forest.region_index_.n_cells} celdas en {time.perf_counter() - start:.1f}s")
+
+    with open(args.source, "rb") as f:
+        source_sha256 = hashlib.sha256(f.read()).hexdigest()
+    save_forest(forest, args.target, metrics=metrics, source_sha256=source_sha256)
+
+    start = time.perf_counter()
+    loaded, _ = load_forest(args.target)
+    artifact_time = time.perf_counter() - start
+
+    # Verifica con filas aleatorias que ambos modelos predicen igual
+    X = np.random.default_rng(0).normal(0, 2, size=(10_000, 4))
+    same_labels = np.array_equal(forest.predict(X), loaded.predict(X))
+    same_proba = np.array_equal(forest.predict_proba(X), loaded.predict_proba(X))
+
+    print(f"✓ Artefacto escrito en: {args.target}")
+    print(f"  • Tamaño pickle: {os.path.getsize(args.source) / 1024:.1f} KiB")
+    print(f"  • Tamaño SRFA: {os.path.getsize(args.target) / 1024:.1f} KiB")
+    print(f"  • Carga pickle: {pickle_time*1000:.2f}ms")
+    print(f"  • Carga SRFA (mmap): {artifact_time*1000:.2f}ms")
+    print(f"  • Predicciones idénticas: {same_labels}")
+    print(f"  • Probabilidades idénticas: {same_proba}")
+    if not (same_labels and same_proba):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Script de pruebas de carga en lazo abierto para la API.
+
+A diferencia de incremental_test.py, las peticiones se envían a una tasa
+objetivo fija sin esperar a que terminen las anteriores, y la latencia se
+mide desde el instante en que la petición *debió* enviarse. Así se evita la
+omisión coordinada y los percentiles reflejan la cola que ven los usuarios.
+"""
+
+import argparse
+import asyncio
+import aiohttp
+import itertools
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+import matplotlib.pyplot as plt
+
+
+class LatencyHistogram:
+    """Histograma log-lineal estilo HDR con error relativo acotado"""
+
+    def __init__(self, precision: float = 0.01, min_value: float = 1e-6):
+        # Cada cubeta cubre un factor (1 + precision) del valor
+        self.precision = precision
+        self.min_value = min_value
+        self._log_base = math.log1p(precision)
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket(self, value: float) -> int:
+        return int(math.log(max(value, self.min_value) / self.min_value) / self._log_base)
+
+    def _bucket_value(self, bucket: int) -> float:
+        # Límite superior de la cubeta: nunca subestima la latencia
+        return self.min_value * math.exp((bucket + 1) * self._log_base)
+
+    def record(self, value: float):
+        """Registrar una latencia en segundos"""
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Latencia en segundos por debajo de la cual cae el q% de las muestras"""
+        if self.total == 0:
+            return 0.0
+        target = max(1, math.ceil(self.total * q / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self._bucket_value(bucket), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+
+@dataclass
+class RateLevelResult:
+    """Resultado de un nivel de tasa objetivo"""
+    target_rps: float
+    achieved_rps: float
+    sent: int
+    successful: int
+    failed: int
+    dropped: int
+    p50: float
+    p90: float
+    p99: float
+    p999: float
+    max_latency: float
+    mean_latency: float
+    status_codes: Dict[int, int] = field(default_factory=dict)
+
+
+class OpenLoopTester:
+    """Generador de carga a tasa de llegada fija con reporte de percentiles"""
+
+    def __init__(self, base_url: str = "http://localhost:8000", max_in_flight: int = 10_000):
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.results: List[RateLevelResult] = []
+
+    @staticmethod
+    def load_payloads(path: str, endpoint: str = "/predict", method: str = "POST") -> List[dict]:
+        """
+        Leer payloads desde un archivo JSONL.
+
+        Cada línea puede ser el cuerpo JSON directamente (ej: {"features": [...]})
+        o un objeto {"method": ..., "endpoint": ..., "body": ...}.
+        """
+        payloads = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict) and "body" in record:
+                    payloads.append({
+                        "method": record.get("method", method),
+                        "endpoint": record.get("endpoint", endpoint),
+                        "body": record["body"]
+                    })
+                else:
+                    payloads.append({"method": method, "endpoint": endpoint, "body": record})
+        if not payloads:
+            raise ValueError(f"No se encontraron payloads en {path}")
+        return payloads
+
+    async def _single_request(self, session, payload, intended_start, histogram, status_codes, counters):
+        """Enviar una petición y medir desde su instante programado"""
+        try:
+            async with session.request(
+                method=payload["method"],
+                url=f"{self.base_url}{payload['endpoint']}",
+                json=payload["body"],
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                await response.read()
+                status_codes[response.status] = status_codes.get(response.status, 0) + 1
+                counters["ok" if response.status < 400 else "failed"] += 1
+        except Exception:
+            status_codes[0] = status_codes.get(0, 0) + 1
+            counters["failed"] += 1
+        finally:
+            histogram.record(time.perf_counter() - intended_start)
+
+    async def run_rate(self, rate: float, duration_seconds: float, payloads: List[dict]) -> RateLevelResult:
+        """Enviar peticiones a `rate` por segundo durante `duration_seconds`"""
+        print(f"\n🚀 Tasa objetivo: {rate:.0f} req/s durante {duration_seconds}s...")
+        histogram = LatencyHistogram()
+        status_codes: Dict[int, int] = {}
+        counters = {"ok": 0, "failed": 0, "dropped": 0}
+        interval = 1.0 / rate
+        total = int(rate * duration_seconds)
+        cycle = itertools.cycle(payloads)
+        tasks = set()
+
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            start = time.perf_counter()
+            for i in range(total):
+                intended = start + i * interval
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Si el cliente se satura se descarta, pero cuenta como fallo con su latencia
+                if len(tasks) >= self.max_in_flight:
+                    counters["dropped"] += 1
+                    histogram.record(time.perf_counter() - intended)
+                    continue
+                task = asyncio.create_task(
+                    self._single_request(session, next(cycle), intended, histogram, status_codes, counters)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            elapsed = time.perf_counter() - start
+
+        result = RateLevelResult(
+            target_rps=rate,
+            achieved_rps=counters["ok"] / elapsed if elapsed > 0 else 0.0,
+            sent=total - counters["dropped"],
+            successful=counters["ok"],
+            failed=counters["failed"],
+            dropped=counters["dropped"],
+            p50=histogram.percentile(50),
+            p90=histogram.percentile(90),
+            p99=histogram.percentile(99),
+            p999=histogram.percentile(99.9),
+            max_latency=histogram.max,
+            mean_latency=histogram.mean,
+            status_codes=status_codes
+        )
+        self._print_result(result)
+        return result
+
+    async def run_ramp(self, rates: List[float], duration_per_level: float, payloads: List[dict]):
+        """Recorrer varias tasas objetivo para obtener la curva de throughput"""
+        print(f"\n{'='*70}")
+        print("PRUEBA DE CARGA EN LAZO ABIERTO")
+        print(f"Tasas: {', '.join(f'{r:.0f}' for r in rates)} req/s")
+        print(f"Duración por nivel: {duration_per_level}s, payloads distintos: {len(payloads)}")
+        print(f"{'='*70}")
+
+        self.results = []
+        for rate in rates:
+            self.results.append(await self.run_rate(rate, duration_per_level, payloads))
+            await asyncio.sleep(2)
+
+        self._print_summary()
+        self._plot_results()
+
+    def _print_result(self, result: RateLevelResult):
+        """Imprimir resultado de un nivel"""
+        print(f"  ✓ Throughput logrado: {result.achieved_rps:.2f} req/s")
+        print(f"  ✓ p50: {result.p50*1000:.2f}ms  p90: {result.p90*1000:.2f}ms  "
+              f"p99: {result.p99*1000:.2f}ms  p99.9: {result.p999*1000:.2f}ms")
+        print(f"  ✓ Máximo: {result.max_latency*1000:.2f}ms")
+        print(f"  ✓ Exitosas: {result.successful}, Fallidas: {result.failed}, Descartadas: {result.dropped}")
+
+    def _print_summary(self):
+        """Imprimir tabla de la curva de throughput"""
+        if not self.results:
+            return
+        print(f"\n{'='*70}")
+        print("RESUMEN: THROUGHPUT VS LATENCIA DE COLA")
+        print(f"{'='*70}\n")
+        print(f"{'objetivo':>10} {'logrado':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'p99.9 ms':>9} {'error %':>8}")
+        for r in self.results:
+            attempts = r.sent + r.dropped
+            error_rate = (r.failed + r.dropped) / attempts * 100 if attempts else 0.0
+            print(f"{r.target_rps:>10.0f} {r.achieved_rps:>10.1f} {r.p50*1000:>9.2f} {r.p90*1000:>9.2f} "
+                  f"{r.p99*1000:>9.2f} {r.p999*1000:>9.2f} {error_rate:>8.2f}")
+        print(f"\n{'='*70}\n")
+
+    def _plot_results(self):
+        """Generar gráficos de percentiles y throughput"""
+        if not self.results:
+            return
+        targets = [r.target_rps for r in self.results]
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+        for attr, label in (("p50", "p50"), ("p90", "p90"), ("p99", "p99"), ("p999", "p99.9")):
+            ax1.plot(targets, [getattr(r, attr) * 1000 for r in self.results], marker='o', label=label)
+        ax1.set_xlabel('Tasa objetivo (req/s)')
+        ax1.set_ylabel('Latencia (ms)')
+        ax1.set_yscale('log')
+        ax1.set_title('Percentiles de latencia vs tasa de llegada')
+        ax1.legend()
+        ax1.grid(True, alpha=0.3)
+
+        ax2.plot(targets, [r.achieved_rps for r in self.results], marker='s', color='green', label='Logrado')
+        ax2.plot(targets, targets, linestyle='--', color='gray', label='Ideal')
+        ax2.set_xlabel('Tasa objetivo (req/s)')
+        ax2.set_ylabel('Throughput logrado (req/s)')
+        ax2.set_title('Curva de throughput')
+        ax2.legend()
+        ax2.grid(True, alpha=0.3)
+
+        plt.tight_layout()
+        filename = f"open_loop_{int(time.time())}.png"
+        plt.savefig(filename, dpi=300, bbox_inches='tight')
+        print(f"📊 Gráfico guardado: {filename}")
+        plt.close()
+
+    def save_report(self, filename: Optional[str] = None):
+        """Guardar resultados en archivo JSON"""
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"open_loop_report_{timestamp}.json"
+        report = {
+            "base_url": self.base_url,
+            "timestamp": datetime.now().isoformat(),
+            "levels": [
+                {
+                    "target_rps": r.target_rps,
+                    "achieved_rps": r.achieved_rps,
+                    "sent": r.sent,
+                    "successful": r.successful,
+                    "failed": r.failed,
+                    "dropped": r.dropped,
+                    "p50_ms": r.p50 * 1000,
+                    "p90_ms": r.p90 * 1000,
+                    "p99_ms": r.p99 * 1000,
+                    "p999_ms": r.p999 * 1000,
+                    "max_ms": r.max_latency * 1000,
+                    "mean_ms": r.mean_latency * 1000,
+                    "status_codes": r.status_codes
+                }
+                for r in self.results
+            ]
+        }
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Reporte guardado en: {filename}")
+
+
+import os
+from dotenv import load_dotenv
+load_dotenv(
+    override=True
+)
+
+
+async def main():
+    """Ejecutar prueba de carga en lazo abierto"""
+    parser = argparse.ArgumentParser(description="Prueba de carga en lazo abierto")
+    parser.add_argument("--rates", default="100,200,400,800",
+                        help="Tasas objetivo en req/s separadas por comas")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos por nivel")
+    parser.add_argument("--endpoint", default="/predict")
+    parser.add_argument("--method", default="POST")
+    parser.add_argument("--payloads", default=None,
+                        help="Archivo JSONL con los payloads a reproducir en ciclo")
+    parser.add_argument("--max-in-flight", type=int, default=10_000)
+    parser.add_argument("--report", default=None, help="Archivo JSON de salida")
+    args = parser.parse_args()
+
+    API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+    tester = OpenLoopTester(base_url=API_BASE_URL, max_in_flight=args.max_in_flight)
+
+    if args.payloads:
+        payloads = tester.load_payloads(args.payloads, args.endpoint, args.method)
+    else:
+        payloads = [{"method": args.method, "endpoint": args.endpoint, "body": {"features": [5.1, 3.5, 1.4, 0.2]}}]
+
+    rates = [float(r) for r in args.rates.split(",")]
+    await tester.run_ramp(rates, args.duration, payloads)
+    tester.save_report(args.report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
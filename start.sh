@@ -11,4 +11,9 @@ set +a
 HOST=${API_BASE_URL:-0.0.0.0}
 PORT=${PORT:-8000}
 
+# ./start.sh prod: workers pre-forzados que comparten el modelo precargado
+if [ "$1" = "prod" ]; then
+    exec python -m app.server --host "$HOST" --port "$PORT"
+fi
+
 uvicorn app.main:app --host "$HOST" --port "$PORT" --reload
\ No newline at end of file
@@ -121,5 +121,86 @@ try {
     Write-Host $_.Exception.Message -ForegroundColor Yellow
 }
 
+Write-Host "`n---`n"
+
+# Test 9: Carga masiva en varios chunks (el cuerpo completo debe procesarse)
+Write-Host "Test 9: POST /predict/bulk - CSV de 60000 filas en chunks" -ForegroundColor Cyan
+$rows = 60000
+$csv = "sepal length (cm),sepal width (cm),petal length (cm),petal width (cm)`n" + ("5.1,3.5,1.4,0.2`n" * $rows)
+try {
+    $response = Invoke-WebRequest -Uri "$baseUrl/predict/bulk" -Method Post -Body $csv -ContentType "text/csv"
+    # Encabezado + una linea por fila
+    $received = ($response.Content.TrimEnd("`n") -split "`n").Count - 1
+    if ($received -eq $rows) {
+        Write-Host "Respuesta completa: $received filas" -ForegroundColor Green
+    } else {
+        Write-Host "Respuesta truncada: $received de $rows filas" -ForegroundColor Red
+    }
+} catch {
+    Write-Host "Error: $($_.Exception.Message)" -ForegroundColor Red
+}
+
+Write-Host "`n---`n"
+
+# Test 10: JSON con Content-Type distinto de application/json (misma respuesta con y sin FAST_PATH_ENABLED)
+Write-Host "Test 10: POST /predict - Content-Type text/plain" -ForegroundColor Cyan
+$bodyText = @{
+    features = @(5.1, 3.5, 1.4, 0.2)
+} | ConvertTo-Json
+
+try {
+    $response = Invoke-RestMethod -Uri "$baseUrl/predict" -Method Post -Body $bodyText -ContentType "text/plain"
+    Write-Host "Respuesta inesperada:" -ForegroundColor Red
+    $response | ConvertTo-Json
+} catch {
+    Write-Host "Error esperado (validacion):" -ForegroundColor Yellow
+    Write-Host $_.Exception.Message -ForegroundColor Yellow
+}
+
+Write-Host "`n---`n"
+
+# Test 11: Carga masiva con una fila invalida al inicio (400 antes de empezar a responder)
+Write-Host "Test 11: POST /predict/bulk - Fila negativa y fila mal formada en el primer bloque" -ForegroundColor Cyan
+$header = "sepal length (cm),sepal width (cm),petal length (cm),petal width (cm)"
+foreach ($badRow in @("-1.0,3.5,1.4,0.2", "5.1,,1.4,0.2", "5.1,3.5,abc,0.2")) {
+    try {
+        $response = Invoke-WebRequest -Uri "$baseUrl/predict/bulk" -Method Post -Body "$header`n5.1,3.5,1.4,0.2`n$badRow`n" -ContentType "text/csv"
+        Write-Host "Error inesperado para '$badRow': HTTP $($response.StatusCode)" -ForegroundColor Red
+    } catch {
+        Write-Host "Error esperado (400) para '$badRow':" -ForegroundColor Yellow
+        Write-Host $_.Exception.Message -ForegroundColor Yellow
+    }
+}
+
+Write-Host "`n---`n"
+
+# Test 12: Carga masiva con una fila invalida despues del primer bloque (linea final de error)
+Write-Host "Test 12: POST /predict/bulk - Fila negativa despues del primer bloque" -ForegroundColor Cyan
+$csv = "$header`n" + ("5.1,3.5,1.4,0.2`n" * 15000) + "-1.0,3.5,1.4,0.2`n" + ("5.1,3.5,1.4,0.2`n" * 100)
+try {
+    $response = Invoke-WebRequest -Uri "$baseUrl/predict/bulk" -Method Post -Body $csv -ContentType "text/csv"
+    $lastLine = ($response.Content.TrimEnd("`n") -split "`n")[-1]
+    if ($lastLine.StartsWith("error,")) {
+        Write-Host "Error esperado al final de la respuesta: $lastLine" -ForegroundColor Yellow
+    } else {
+        Write-Host "Respuesta sin linea de error: $lastLine" -ForegroundColor Red
+    }
+} catch {
+    Write-Host "Error: $($_.Exception.Message)" -ForegroundColor Red
+}
+
+Write-Host "`n---`n"
+
 python ./scripts/api_validator.py
+
+# Benchmarks en proceso: falla si algun caso empeora respecto a benchmarks/baseline.json
+# cuando la maquina coincide con la de la linea base; BENCH_STRICT=1 falla en cualquier maquina
+Write-Host "`nBenchmarks - Comparacion contra la linea base" -ForegroundColor Cyan
+if ($env:BENCH_STRICT -eq "1") {
+    python ./scripts/benchmark.py --strict
+} else {
+    python ./scripts/benchmark.py
+}
+$benchStatus = $LASTEXITCODE
 Write-Host "`n=== Pruebas completadas ===" -ForegroundColor Magenta
+exit $benchStatus
@@ -150,4 +150,86 @@ else
     echo "$body"
 fi
 
-echo -e "\n${MAGENTA}=== Pruebas completadas ===${NC}"
\ No newline at end of file
+echo -e "\n---\n"
+
+# Test 9: Carga masiva en varios chunks (el cuerpo completo debe procesarse)
+echo -e "${CYAN}Test 9: POST /predict/bulk - CSV de 60000 filas en chunks${NC}"
+rows=60000
+bulk_lines=$({
+    echo "sepal length (cm),sepal width (cm),petal length (cm),petal width (cm)"
+    for _ in $(seq 1 $rows); do echo "5.1,3.5,1.4,0.2"; done
+} | curl -s -X POST "$BASE_URL/predict/bulk" -H "Content-Type: text/csv" -H "Transfer-Encoding: chunked" -T - | wc -l)
+
+# Encabezado + una linea por fila
+if [ "$bulk_lines" -eq $((rows + 1)) ]; then
+    echo -e "${GREEN}Respuesta completa: $((bulk_lines - 1)) filas${NC}"
+else
+    echo -e "${RED}Respuesta truncada: $((bulk_lines - 1)) de $rows filas${NC}"
+fi
+
+echo -e "\n---\n"
+
+# Test 10: JSON con Content-Type distinto de application/json (misma respuesta con y sin FAST_PATH_ENABLED)
+echo -e "${CYAN}Test 10: POST /predict - Content-Type text/plain${NC}"
+response=$(curl -s -w "\n%{http_code}" -X POST "$BASE_URL/predict" \
+    -H "Content-Type: text/plain" \
+    -d '{"features": [5.1, 3.5, 1.4, 0.2]}')
+http_code=$(echo "$response" | tail -n1)
+body=$(echo "$response" | sed '$d')
+
+if [ "$http_code" -eq 422 ]; then
+    echo -e "${YELLOW}Error esperado (validacion):${NC}"
+    echo "$body" | jq .
+else
+    echo -e "${RED}Error inesperado: HTTP $http_code${NC}"
+    echo "$body"
+fi
+
+echo -e "\n---\n"
+
+# Test 11: Carga masiva con una fila invalida al inicio (400 antes de empezar a responder)
+echo -e "${CYAN}Test 11: POST /predict/bulk - Fila negativa y fila mal formada en el primer bloque${NC}"
+header="sepal length (cm),sepal width (cm),petal length (cm),petal width (cm)"
+for bad_row in "-1.0,3.5,1.4,0.2" "5.1,,1.4,0.2" "5.1,3.5,abc,0.2"; do
+    response=$(printf '%s\n5.1,3.5,1.4,0.2\n%s\n' "$header" "$bad_row" | \
+        curl -s -w "\n%{http_code}" -X POST "$BASE_URL/predict/bulk" -H "Content-Type: text/csv" --data-binary @-)
+    http_code=$(echo "$response" | tail -n1)
+    body=$(echo "$response" | sed '$d')
+    if [ "$http_code" -eq 400 ]; then
+        echo -e "${YELLOW}Error esperado (400) para '$bad_row':${NC} $body"
+    else
+        echo -e "${RED}Error inesperado para '$bad_row': HTTP $http_code${NC}"
+    fi
+done
+
+echo -e "\n---\n"
+
+# Test 12: Carga masiva con una fila invalida despues del primer bloque (linea final de error)
+echo -e "${CYAN}Test 12: POST /predict/bulk - Fila negativa despues del primer bloque${NC}"
+last_line=$({
+    echo "$header"
+    for _ in $(seq 1 15000); do echo "5.1,3.5,1.4,0.2"; done
+    echo "-1.0,3.5,1.4,0.2"
+    for _ in $(seq 1 100); do echo "5.1,3.5,1.4,0.2"; done
+} | curl -s -X POST "$BASE_URL/predict/bulk" -H "Content-Type: text/csv" -T - | tail -n1)
+
+if [[ "$last_line" == error,* ]]; then
+    echo -e "${YELLOW}Error esperado al final de la respuesta:${NC} $last_line"
+else
+    echo -e "${RED}Respuesta sin linea de error: $last_line${NC}"
+fi
+
+echo -e "\n---\n"
+
+# Benchmarks en proceso: falla si algún caso empeora respecto a benchmarks/baseline.json
+# cuando la máquina coincide con la de la línea base; BENCH_STRICT=1 falla en cualquier máquina
+echo -e "${CYAN}Benchmarks - Comparacion contra la linea base${NC}"
+if [ "${BENCH_STRICT:-0}" = "1" ]; then
+    python ./scripts/benchmark.py --strict
+else
+    python ./scripts/benchmark.py
+fi
+bench_status=$?
+
+echo -e "\n${MAGENTA}=== Pruebas completadas ===${NC}"
+exit $bench_status
\ No newline at end of file